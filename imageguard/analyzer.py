@@ -2,28 +2,33 @@
 
 from __future__ import annotations
 
-import uuid
-from datetime import datetime, timezone
-from typing import Dict, List, Optional
-
+import io
 import json
-from pathlib import Path
-import time
 import logging
+import os
+import stat
 import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
+from functools import lru_cache, partial
+from importlib import import_module
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional
 
-from .config import Config, load_config
-from .preprocess import ImageValidationError, load_image, normalize_resolution
-from .frequency import analyze_frequency
-from .hidden_text import analyze_hidden_text
-from .scoring import classify_tiered, weighted_average
-from .text_analysis import analyze_text
-from .patterns import load_patterns
-from .steganography import analyze_steganography
-from .structural import analyze_structural
-from .calibration import load_calibration, platt_confidence
-from .overlays import create_marked_image
+from .config import Config, _load_config_cached, load_config
+from .preprocess import (
+    ImageValidationError,
+    PreprocessedImage,
+    SharedArrays,
+    load_image,
+    load_image_fileobj,
+    normalize_resolution,
+)
+from .scoring import classify_tiered, score_stats
+from .patterns import _load_document_cached, _load_patterns_cached, load_patterns
+from .calibration import _load_calibration_cached, load_calibration, platt_confidence
 
 
 CANONICAL_MODULES = {"text_extraction", "hidden_text", "frequency_analysis", "steganography", "structural"}
@@ -37,9 +42,80 @@ MODULE_ALIASES = {
     "struct": "structural",
 }
 SUPPORTED_INPUT_MODULES = sorted(CANONICAL_MODULES | set(MODULE_ALIASES.keys()) | {"all"})
+# Module entry points as (name, submodule, function), in the order results are reported.
+# Submodules are imported only when an ImageGuard selects them (OpenCV/pywt are slow to import).
+MODULE_RUNNERS = (
+    ("text_extraction", ".text_analysis", "analyze_text"),
+    ("hidden_text", ".hidden_text", "analyze_hidden_text"),
+    ("frequency_analysis", ".frequency", "analyze_frequency"),
+    ("steganography", ".steganography", "analyze_steganography"),
+    ("structural", ".structural", "analyze_structural"),
+)
+# Modules whose entry point also takes the original image area.
+AREA_MODULES = frozenset({"text_extraction", "hidden_text"})
 
 logger = logging.getLogger("imageguard")
-logging.basicConfig(level=logging.INFO)
+logger.addHandler(logging.NullHandler())
+
+
+@lru_cache(maxsize=64)
+def _load_and_normalize_cached(path: str, mtime_ns: int, size: int, max_bytes: int, target_resolution: int):
+    pre = load_image(path, max_bytes=max_bytes, known_size=size)
+    # Basic resizing to keep OCR reliable.
+    image = normalize_resolution(pre.image, max_dimension=target_resolution)
+    # Keep only the normalized image so cache entries don't also pin the full-resolution decode.
+    meta = PreprocessedImage(image=image, original_format=pre.original_format, width=pre.width, height=pre.height)
+    return meta, image
+
+
+def _load_and_normalize(path: Path, st: Optional[os.stat_result], max_bytes: int, target_resolution: int):
+    """Load and normalize an image, reusing the decode when (path, mtime, size) is unchanged.
+
+    ``st`` is the caller's stat of ``path`` (None if it failed), so the file is stat'ed once.
+    Returns a copy of the cached image so callers can't mutate the cached object.
+    """
+    if st is None or stat.S_ISDIR(st.st_mode):
+        pre = load_image(path, max_bytes=max_bytes)  # raises the appropriate error
+        return pre, normalize_resolution(pre.image, max_dimension=target_resolution)
+    pre, image = _load_and_normalize_cached(str(path), st.st_mtime_ns, st.st_size, max_bytes, target_resolution)
+    return pre, image.copy()
+
+
+# Parsed frequency baselines keyed by (path, mtime_ns); shared across instances, read-only.
+_baseline_cache: Dict[tuple, Dict] = {}
+
+
+def _load_frequency_baseline(path: str) -> Optional[Dict]:
+    try:
+        key = (str(path), Path(path).stat().st_mtime_ns)
+    except OSError:
+        return None
+    baseline = _baseline_cache.get(key)
+    if baseline is None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except Exception:
+            return None
+        _baseline_cache[key] = baseline
+    return baseline
+
+
+class _FailClosed(Exception):
+    """Raised by a module run when fail-closed policy should short-circuit analysis."""
+
+
+# ImageGuard built once per analyze_many worker process by _init_worker.
+_worker_guard: Optional["ImageGuard"] = None
+
+
+def _init_worker(guard_kwargs: Dict) -> None:
+    global _worker_guard
+    _worker_guard = ImageGuard(**guard_kwargs)
+
+
+def _analyze_in_worker(image_path: str, **kwargs) -> Dict:
+    return _worker_guard.analyze(image_path, **kwargs)
 
 
 class ImageGuard:
@@ -53,18 +129,30 @@ class ImageGuard:
         config_path: Optional[str] = None,
     ):
         self.config = config or load_config(config_path)
+        # Settings analyze_many hands to worker processes to rebuild an equivalent guard.
+        self._guard_kwargs = {"modules": modules, "threshold": threshold, "weights": weights, "languages": languages, "config": self.config}
         if modules is None or "all" in modules:
             self.modules = [m for m, cfg in (self.config.modules or {}).items() if cfg.enabled]
         else:
             self.modules = [MODULE_ALIASES.get(m, m) for m in modules]
         self.thresholds = self.config.thresholds
         self.threshold_override = threshold
+        # Response copies of the thresholds, built once and shared by every response (read-only).
+        self._thresholds_dict = dict(self.thresholds.__dict__)
+        self._override_dict: Optional[Dict[str, float]] = None
         # Merge weights from config with overrides
         cfg_weights = {name: cfg.weight for name, cfg in (self.config.modules or {}).items()}
         merged_weights = cfg_weights | (weights or {})
         self.weights = merged_weights or {"text_extraction": 2.0, "hidden_text": 1.5, "frequency_analysis": 1.0}
         self.languages = languages or (self.config.modules.get("text_extraction").languages if self.config.modules else ["eng"])
         self._validate_modules(self.modules)
+        requested = frozenset(self.modules)
+        self._active = tuple(
+            (name, getattr(import_module(submodule, __package__), function))
+            for name, submodule, function in MODULE_RUNNERS
+            if name in requested
+        )
+        self._total_weight = sum(self.weights.get(name, 1.0) for name, _ in self._active)
         # Load patterns from config if available
         pattern_path = None
         if self.config.modules and "text_extraction" in self.config.modules:
@@ -74,14 +162,21 @@ class ImageGuard:
         self.frequency_baseline = None
         if self.config.modules and "frequency_analysis" in self.config.modules:
             baseline_path = getattr(self.config.modules["frequency_analysis"], "baseline_model", None)
-            if baseline_path and Path(baseline_path).exists():
-                try:
-                    with open(baseline_path, "r", encoding="utf-8") as f:
-                        self.frequency_baseline = json.load(f)
-                except Exception:
-                    self.frequency_baseline = None
+            if baseline_path:
+                self.frequency_baseline = _load_frequency_baseline(baseline_path)
         # Load calibration data
         self.calibration = load_calibration(self.config.calibration_data)
+        self._module_kwargs = self._build_module_kwargs()
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop cached image decodes and parsed config/pattern/calibration/baseline files."""
+        _load_and_normalize_cached.cache_clear()
+        _load_config_cached.cache_clear()
+        _load_patterns_cached.cache_clear()
+        _load_document_cached.cache_clear()
+        _load_calibration_cached.cache_clear()
+        _baseline_cache.clear()
 
     def _validate_modules(self, modules: List[str]) -> None:
         unknown = [m for m in modules if m not in CANONICAL_MODULES]
@@ -90,16 +185,41 @@ class ImageGuard:
 
     def analyze(
         self,
-        image_path: str,
+        image_path: str | os.PathLike | bytes | BinaryIO,
         return_marked: bool = False,
         include_text: Optional[bool] = None,
         max_text_length: Optional[int] = None,
+        filename: Optional[str] = None,
     ):
-        path = Path(image_path)
-        file_size = path.stat().st_size if path.exists() else 0
+        """Analyze an image given as a path, raw bytes, or a seekable binary stream.
 
+        ``filename`` names in-memory input in ``image_info`` and supplies the extension used
+        for magic-byte validation; for paths it defaults to the file name. In-memory input
+        bypasses the decoded-image cache.
+        """
+        max_bytes = self.config.max_image_size_mb * 1024 * 1024
         try:
-            pre = load_image(image_path, max_bytes=self.config.max_image_size_mb * 1024 * 1024)
+            if isinstance(image_path, (bytes, bytearray, memoryview)) or hasattr(image_path, "read"):
+                stream = image_path if hasattr(image_path, "read") else io.BytesIO(image_path)
+                start = stream.tell()
+                file_size = stream.seek(0, os.SEEK_END) - start
+                stream.seek(start)
+                pre = load_image_fileobj(stream, filename=filename, max_bytes=max_bytes, known_size=file_size)
+                image = normalize_resolution(pre.image, max_dimension=self.config.target_resolution)
+            else:
+                path = Path(image_path)
+                filename = filename or path.name
+                try:
+                    st = path.stat()
+                except OSError:
+                    st = None
+                file_size = st.st_size if st else 0
+                pre, image = _load_and_normalize(
+                    path,
+                    st,
+                    max_bytes=max_bytes,
+                    target_resolution=self.config.target_resolution,
+                )
         except FileNotFoundError:
             raise
         except ImageValidationError as exc:
@@ -107,192 +227,46 @@ class ImageGuard:
         except Exception as exc:
             raise ImageValidationError(str(exc)) from exc
 
-        # Basic resizing to keep OCR reliable.
-        image = normalize_resolution(pre.image, max_dimension=self.config.target_resolution)
-
         # Build image_info per PRD Section 7.3.2
         image_info = {
-            "filename": path.name,
+            "filename": filename,
             "format": pre.original_format,
             "dimensions": {"width": pre.width, "height": pre.height},
             "size_bytes": file_size,
             "normalized_dimensions": {"width": image.width, "height": image.height},
         }
 
-        module_scores: Dict[str, Dict] = {}
         start_overall = time.perf_counter()
-        if "text_extraction" in self.modules:
-            start = time.perf_counter()
-            try:
-                include_text = include_text if include_text is not None else (self.config.output.include_extracted_text if self.config.output else True)
-                max_len = max_text_length if max_text_length is not None else (self.config.output.max_text_length if self.config.output else 10000)
-                text_cfg = self.config.modules.get("text_extraction") if self.config.modules else None
-                tesseract_cmd = text_cfg.tesseract_cmd if text_cfg else None
-                text_result = analyze_text(
-                    image,
-                    pre.area,
-                    languages=self.languages,
-                    patterns=self.patterns,
-                    include_text=include_text,
-                    max_text_length=max_len,
-                    tesseract_cmd=tesseract_cmd,
-                )
-            except Exception as exc:  # pragma: no cover - defensive
-                if not self.config.fail_open:
-                    return self._fail_closed_response(str(exc))
-                text_result = {"score": None, "details": {"status": "error", "message": str(exc)}}
-            elapsed = time.perf_counter() - start
-            if elapsed > self.config.timeout_seconds:
-                if not self.config.fail_open:
-                    return self._fail_closed_response("text_extraction timeout")
-                text_result = {"score": None, "details": {"status": "timeout", "message": "text_extraction exceeded timeout"}}
-            else:
-                text_result["details"]["latency_ms"] = int(elapsed * 1000)
-                text_result["details"].setdefault("status", "ok")
-                text_result["latency_ms"] = text_result["details"]["latency_ms"]
-                text_result["status"] = text_result["details"]["status"]
-            module_scores["text_extraction"] = text_result
-
-        if "hidden_text" in self.modules:
-            try:
-                hidden_cfg = self.config.modules.get("hidden_text") if self.config.modules else None
-                thresholds = None
-                if hidden_cfg:
-                    thresholds = hidden_cfg.contrast_thresholds or hidden_cfg.thresholds
-                edge_threshold = hidden_cfg.edge_density_threshold if hidden_cfg else 0.15
-                edge_grid = hidden_cfg.edge_grid_size if hidden_cfg else 4
-                # Get tesseract_cmd from text_extraction config (shared between OCR modules)
-                text_cfg = self.config.modules.get("text_extraction") if self.config.modules else None
-                tesseract_cmd = text_cfg.tesseract_cmd if text_cfg else None
-                start = time.perf_counter()
-                hidden_result = analyze_hidden_text(
-                    image,
-                    pre.area,
-                    languages=self.languages,
-                    patterns=self.patterns,
-                    thresholds=thresholds,
-                    edge_density_threshold=edge_threshold,
-                    edge_grid_size=edge_grid,
-                    tesseract_cmd=tesseract_cmd,
-                )
-                elapsed = time.perf_counter() - start
-            except Exception as exc:  # pragma: no cover - defensive
-                if not self.config.fail_open:
-                    return self._fail_closed_response(str(exc))
-                hidden_result = {"score": None, "details": {"status": "error", "message": str(exc)}}
-                elapsed = 0
-            if elapsed > self.config.timeout_seconds:
-                if not self.config.fail_open:
-                    return self._fail_closed_response("hidden_text timeout")
-                hidden_result = {"score": None, "details": {"status": "timeout", "message": "hidden_text exceeded timeout"}}
-            else:
-                hidden_result["details"]["latency_ms"] = int(elapsed * 1000)
-                hidden_result["details"].setdefault("status", "ok")
-                hidden_result["latency_ms"] = hidden_result["details"]["latency_ms"]
-                hidden_result["status"] = hidden_result["details"]["status"]
-            module_scores["hidden_text"] = hidden_result
-
-        if "frequency_analysis" in self.modules:
-            try:
-                freq_cfg = self.config.modules.get("frequency_analysis") if self.config.modules else None
-                start = time.perf_counter()
-                freq_result = analyze_frequency(
-                    image,
-                    fft_enabled=freq_cfg.fft_enabled if freq_cfg else True,
-                    dct_enabled=freq_cfg.dct_enabled if freq_cfg else True,
-                    wavelet_enabled=freq_cfg.wavelet_enabled if freq_cfg else True,
-                    fft_threshold=freq_cfg.fft_threshold if freq_cfg else 0.7,
-                    dct_threshold=freq_cfg.dct_threshold if freq_cfg else 0.6,
-                    wavelet_threshold=freq_cfg.wavelet_threshold if freq_cfg else 0.5,
-                    wavelet_type=freq_cfg.wavelet_type if freq_cfg else "haar",
-                    wavelet_levels=freq_cfg.wavelet_levels if freq_cfg else 1,
-                    baseline=self.frequency_baseline,
-                )
-                elapsed = time.perf_counter() - start
-            except Exception as exc:  # pragma: no cover - defensive
-                if not self.config.fail_open:
-                    return self._fail_closed_response(str(exc))
-                freq_result = {"score": None, "details": {"status": "error", "message": str(exc)}}
-                elapsed = 0
-            if elapsed > self.config.timeout_seconds:
-                if not self.config.fail_open:
-                    return self._fail_closed_response("frequency_analysis timeout")
-                freq_result = {"score": None, "details": {"status": "timeout", "message": "frequency_analysis exceeded timeout"}}
-            else:
-                freq_result["details"]["latency_ms"] = int(elapsed * 1000)
-                freq_result["details"].setdefault("status", "ok")
-                freq_result["latency_ms"] = freq_result["details"]["latency_ms"]
-                freq_result["status"] = freq_result["details"]["status"]
-            module_scores["frequency_analysis"] = freq_result
-
-        if "steganography" in self.modules:
-            try:
-                stego_cfg = self.config.modules.get("steganography") if self.config.modules else None
-                start = time.perf_counter()
-                stego_result = analyze_steganography(
-                    image,
-                    lsb_enabled=stego_cfg.lsb_analysis if stego_cfg else True,
-                    chi_square_enabled=stego_cfg.chi_square_test if stego_cfg else True,
-                    rs_enabled=stego_cfg.rs_analysis if stego_cfg else True,
-                    spa_enabled=stego_cfg.spa_analysis if stego_cfg else False,
-                )
-                elapsed = time.perf_counter() - start
-            except Exception as exc:  # pragma: no cover - defensive
-                if not self.config.fail_open:
-                    return self._fail_closed_response(str(exc))
-                stego_result = {"score": None, "details": {"status": "error", "message": str(exc)}}
-                elapsed = 0
-            if elapsed > self.config.timeout_seconds:
-                if not self.config.fail_open:
-                    return self._fail_closed_response("steganography timeout")
-                stego_result = {"score": None, "details": {"status": "timeout", "message": "steganography exceeded timeout"}}
-            else:
-                stego_result["details"]["latency_ms"] = int(elapsed * 1000)
-                stego_result["details"].setdefault("status", "ok")
-                stego_result["latency_ms"] = stego_result["details"]["latency_ms"]
-                stego_result["status"] = stego_result["details"]["status"]
-            module_scores["steganography"] = stego_result
-
-        if "structural" in self.modules:
-            try:
-                struct_cfg = self.config.modules.get("structural") if self.config.modules else None
-                start = time.perf_counter()
-                struct_result = analyze_structural(
-                    image,
-                    enable_qr=struct_cfg.detect_qr if struct_cfg else True,
-                    enable_barcodes=struct_cfg.detect_barcodes if struct_cfg else True,
-                    enable_screenshots=struct_cfg.detect_screenshots if struct_cfg else True,
-                    analyze_decoded_content=struct_cfg.analyze_decoded_content if struct_cfg else True,
-                    patterns=self.patterns,
-                )
-                elapsed = time.perf_counter() - start
-            except Exception as exc:  # pragma: no cover - defensive
-                if not self.config.fail_open:
-                    return self._fail_closed_response(str(exc))
-                struct_result = {"score": None, "details": {"status": "error", "message": str(exc)}}
-                elapsed = 0
-            if elapsed > self.config.timeout_seconds:
-                if not self.config.fail_open:
-                    return self._fail_closed_response("structural timeout")
-                struct_result = {"score": None, "details": {"status": "timeout", "message": "structural exceeded timeout"}}
-            else:
-                struct_result["details"]["latency_ms"] = int(elapsed * 1000)
-                struct_result["details"].setdefault("status", "ok")
-                struct_result["latency_ms"] = struct_result["details"]["latency_ms"]
-                struct_result["status"] = struct_result["details"]["status"]
-            module_scores["structural"] = struct_result
-
-        scores_for_weighting = {
-            name: mod_result.get("score") for name, mod_result in module_scores.items() if mod_result is not None
-        }
-        risk_score = weighted_average(scores_for_weighting, self.weights)
+        # One timestamp per request, shared by the normal and fail-closed responses.
+        timestamp = datetime.now(timezone.utc).isoformat()
+        # Convert once; every module reads the same (read-only) RGB/grayscale buffers.
+        arrays = SharedArrays.from_image(image)
+        text_kwargs = self._module_kwargs["text_extraction"]
+        if include_text is not None:
+            text_kwargs = text_kwargs | {"include_text": include_text}
+        if max_text_length is not None:
+            text_kwargs = text_kwargs | {"max_text_length": max_text_length}
+        tasks = [
+            (
+                name,
+                fn,
+                (arrays, pre.area) if name in AREA_MODULES else (arrays,),
+                text_kwargs if name == "text_extraction" else self._module_kwargs[name],
+            )
+            for name, fn in self._active
+        ]
+        # Overlays need every module's result, so marked requests always run all modules.
+        stop_at = None
+        if self.config.early_exit and not return_marked:
+            stop_at = self.threshold_override if self.threshold_override is not None else self.thresholds.dangerous
+        try:
+            module_scores = self._run_modules(tasks, stop_at=stop_at)
+        except _FailClosed as exc:
+            return self._fail_closed_response(str(exc), timestamp=timestamp)
+
+        risk_score, score_variance = score_stats(module_scores, self.weights)
         if self.threshold_override is not None:
             classification = "DANGEROUS" if risk_score >= self.threshold_override else "SAFE"
-            thresholds_used = {
-                "safe": self.threshold_override,
-                "suspicious": self.threshold_override,
-                "dangerous": self.threshold_override,
-            }
         else:
             classification = classify_tiered(
                 risk_score,
@@ -300,24 +274,32 @@ class ImageGuard:
                 suspicious=self.thresholds.suspicious,
                 dangerous=self.thresholds.dangerous,
             )
-            thresholds_used = self.thresholds.__dict__
+        thresholds_used = self._thresholds_used()
 
         processing_time_ms = int((time.perf_counter() - start_overall) * 1000)
 
         marked_image_path = None
         if return_marked:
-            # Create marked image with visual overlays for flagged regions
-            text_cfg = self.config.modules.get("text_extraction") if self.config.modules else None
-            tesseract_cmd = text_cfg.tesseract_cmd if text_cfg else None
-            marked_image = create_marked_image(image, module_scores, languages=self.languages, tesseract_cmd=tesseract_cmd)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                marked_image.save(tmp.name, format="PNG")
+            # Create marked image with visual overlays for flagged regions. SAFE results and
+            # results with nothing to draw skip the overlay pass (and its extra OCR run).
+            from .overlays import create_marked_image, has_overlays
+
+            if classification == "SAFE" or not has_overlays(module_scores):
+                marked_image = image
+            else:
+                tesseract_cmd = self._module_kwargs["text_extraction"]["tesseract_cmd"]
+                marked_image = create_marked_image(image, module_scores, languages=self.languages, tesseract_cmd=tesseract_cmd)
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".png", dir=self.config.output.temp_dir) as tmp:
+                marked_image.save(
+                    tmp,
+                    format="PNG",
+                    compress_level=self.config.output.marked_compress_level,
+                    optimize=False,
+                )
                 marked_image_path = tmp.name
 
         # Calculate confidence based on module agreement and score distribution
-        valid_scores = [m["score"] for m in module_scores.values() if m.get("score") is not None]
-        if valid_scores:
-            score_variance = sum((s - risk_score) ** 2 for s in valid_scores) / len(valid_scores)
+        if score_variance is not None:
             confidence_raw = max(0.5, min(0.99, 1.0 - score_variance))
         else:
             confidence_raw = 0.5
@@ -332,8 +314,8 @@ class ImageGuard:
 
         # Build response per PRD Section 7.3.2
         return {
-            "request_id": str(uuid.uuid4()),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "request_id": uuid.uuid4().hex,
+            "timestamp": timestamp,
             "processing_time_ms": processing_time_ms,
             "image_info": image_info,
             "result": {
@@ -342,18 +324,159 @@ class ImageGuard:
                 "confidence": round(confidence, 4),
                 "confidence_raw": round(confidence_raw, 4),
                 "confidence_method": confidence_method,
-                "threshold_used": thresholds_used.get("dangerous", 0.6) if isinstance(thresholds_used, dict) else thresholds_used,
+                "threshold_used": thresholds_used["dangerous"],
                 "thresholds": thresholds_used,
             },
             "module_scores": module_scores,
             "marked_image_path": marked_image_path,
         }
 
-    def _fail_closed_response(self, message: str):
+    def analyze_many(self, image_paths: Iterable[str | os.PathLike], workers: Optional[int] = None, **kwargs) -> List[Dict]:
+        """Analyze image files in parallel worker processes; results keep the input order.
+
+        Modules are CPU-bound and hold the GIL for much of their work, so a batch scales
+        with processes rather than threads. Each worker builds an ImageGuard with these
+        settings once and reuses it. ``kwargs`` are passed to ``analyze``; ``workers``
+        defaults to the CPU count, and a single worker analyzes in this process.
+        """
+        paths = [os.fspath(p) for p in image_paths]
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        if workers <= 1:
+            return [self.analyze(p, **kwargs) for p in paths]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self._guard_kwargs,)) as pool:
+            return list(pool.map(partial(_analyze_in_worker, **kwargs), paths))
+
+    def _thresholds_used(self) -> Dict[str, float]:
+        """Thresholds reported in the response; the override dict is rebuilt only if the override changes."""
+        override = self.threshold_override
+        if override is None:
+            return self._thresholds_dict
+        if self._override_dict is None or self._override_dict["dangerous"] != override:
+            self._override_dict = {"safe": override, "suspicious": override, "dangerous": override}
+        return self._override_dict
+
+    def _build_module_kwargs(self) -> Dict[str, Dict]:
+        """Resolve per-module keyword arguments once so analyze() only does dict lookups."""
+        modules_cfg = self.config.modules or {}
+        text_cfg = modules_cfg.get("text_extraction")
+        hidden_cfg = modules_cfg.get("hidden_text")
+        freq_cfg = modules_cfg.get("frequency_analysis")
+        stego_cfg = modules_cfg.get("steganography")
+        struct_cfg = modules_cfg.get("structural")
+        output_cfg = self.config.output
+        # tesseract_cmd lives on text_extraction but is shared between the OCR modules.
+        tesseract_cmd = text_cfg.tesseract_cmd if text_cfg else None
+        return {
+            "text_extraction": {
+                "languages": self.languages,
+                "patterns": self.patterns,
+                "include_text": output_cfg.include_extracted_text if output_cfg else True,
+                "max_text_length": output_cfg.max_text_length if output_cfg else 10000,
+                "tesseract_cmd": tesseract_cmd,
+            },
+            "hidden_text": {
+                "languages": self.languages,
+                "patterns": self.patterns,
+                "thresholds": (hidden_cfg.contrast_thresholds or hidden_cfg.thresholds) if hidden_cfg else None,
+                "edge_density_threshold": hidden_cfg.edge_density_threshold if hidden_cfg else 0.15,
+                "edge_grid_size": hidden_cfg.edge_grid_size if hidden_cfg else 4,
+                "tesseract_cmd": tesseract_cmd,
+            },
+            "frequency_analysis": {
+                "fft_enabled": freq_cfg.fft_enabled if freq_cfg else True,
+                "dct_enabled": freq_cfg.dct_enabled if freq_cfg else True,
+                "wavelet_enabled": freq_cfg.wavelet_enabled if freq_cfg else True,
+                "fft_threshold": freq_cfg.fft_threshold if freq_cfg else 0.7,
+                "dct_threshold": freq_cfg.dct_threshold if freq_cfg else 0.6,
+                "wavelet_threshold": freq_cfg.wavelet_threshold if freq_cfg else 0.5,
+                "wavelet_type": freq_cfg.wavelet_type if freq_cfg else "haar",
+                "wavelet_levels": freq_cfg.wavelet_levels if freq_cfg else 1,
+                "baseline": self.frequency_baseline,
+                "tile_size": freq_cfg.tile_size if freq_cfg else 0,
+            },
+            "steganography": {
+                "lsb_enabled": stego_cfg.lsb_analysis if stego_cfg else True,
+                "chi_square_enabled": stego_cfg.chi_square_test if stego_cfg else True,
+                "rs_enabled": stego_cfg.rs_analysis if stego_cfg else True,
+                "spa_enabled": stego_cfg.spa_analysis if stego_cfg else False,
+            },
+            "structural": {
+                "enable_qr": struct_cfg.detect_qr if struct_cfg else True,
+                "enable_barcodes": struct_cfg.detect_barcodes if struct_cfg else True,
+                "enable_screenshots": struct_cfg.detect_screenshots if struct_cfg else True,
+                "analyze_decoded_content": struct_cfg.analyze_decoded_content if struct_cfg else True,
+                "patterns": self.patterns,
+            },
+        }
+
+    def _run_modules(self, tasks, stop_at: Optional[float] = None) -> Dict[str, Dict]:
+        """Run the selected modules concurrently and return their results in task order.
+
+        Modules are independent given the normalized image, so they share a thread pool
+        (Tesseract subprocesses, NumPy, OpenCV and pywavelets all release the GIL).
+
+        With ``stop_at`` set, collection stops as soon as the finished modules alone put a
+        lower bound on the risk score at or above it; unfinished modules are reported as
+        skipped. The bound holds because pending modules can only add non-negative scores
+        (or drop out of the weighted average entirely).
+        """
+        if not tasks:
+            return {}
+        total_weight = self._total_weight
+        accumulated = 0.0
+        results: Dict[str, Dict] = {}
+        executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="imageguard")
+        try:
+            futures = {
+                executor.submit(self._run_module, name, fn, *args, **kwargs): name
+                for name, fn, args, kwargs in tasks
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                results[name] = future.result()
+                if stop_at is None or results[name].get("score") is None:
+                    continue
+                accumulated += self.weights.get(name, 1.0) * results[name]["score"]
+                if total_weight and accumulated / total_weight >= stop_at and len(results) < len(tasks):
+                    logger.debug("early exit after %s: risk lower bound reached %.2f", name, stop_at)
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return {
+            task[0]: results.get(task[0]) or {"score": None, "details": {"status": "skipped", "message": "early exit"}}
+            for task in tasks
+        }
+
+    def _run_module(self, name: str, fn, *args, **kwargs) -> Dict:
+        """Run one analyzer, applying the timeout and fail-open policy.
+
+        Returns the module result with ``latency_ms``/``status`` stamped on it, or raises
+        ``_FailClosed`` when the module fails and fail-open is disabled.
+        """
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:  # pragma: no cover - defensive
+            if not self.config.fail_open:
+                raise _FailClosed(str(exc)) from exc
+            return {"score": None, "details": {"status": "error", "message": str(exc)}}
+        elapsed = time.perf_counter() - start
+        if elapsed > self.config.timeout_seconds:
+            if not self.config.fail_open:
+                raise _FailClosed(f"{name} timeout")
+            return {"score": None, "details": {"status": "timeout", "message": f"{name} exceeded timeout"}}
+        details = result["details"]
+        details["latency_ms"] = int(elapsed * 1000)
+        details.setdefault("status", "ok")
+        result["latency_ms"] = details["latency_ms"]
+        result["status"] = details["status"]
+        return result
+
+    def _fail_closed_response(self, message: str, timestamp: Optional[str] = None):
         """Return DANGEROUS classification when fail-closed policy is active."""
         return {
-            "request_id": str(uuid.uuid4()),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "request_id": uuid.uuid4().hex,
+            "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
             "processing_time_ms": 0,
             "image_info": None,
             "result": {
@@ -361,7 +484,7 @@ class ImageGuard:
                 "risk_score": 1.0,
                 "confidence": 1.0,
                 "threshold_used": self.thresholds.dangerous,
-                "thresholds": self.thresholds.__dict__,
+                "thresholds": self._thresholds_dict,
                 "note": "Fail-closed policy applied due to error",
             },
             "module_scores": {"error": {"score": 1.0, "details": {"status": "error", "message": message}}},
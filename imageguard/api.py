@@ -2,28 +2,84 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
+import os
 import shutil
-import tempfile
+import signal
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uuid
 
-import yaml
-
-from fastapi import FastAPI, File, UploadFile, Request, HTTPException, Depends
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi import APIRouter, FastAPI, File, UploadFile, Request, HTTPException, Depends
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyHeader
 
 from .analyzer import ImageGuard, SUPPORTED_INPUT_MODULES
-from .config import load_config
+from .config import Config, load_config, parse_csv
+from .patterns import load_patterns_document
+from .preprocess import sniff_image_format
+from .serialization import dumps
+
+logger = logging.getLogger("imageguard")
 
 # Load config at startup
 _config = load_config()
 
-app = FastAPI(title="ImageGuard", version="0.2.0")
+API_PREFIX = "/api/v1"
+
+# Endpoints that report config re-read it at most this often (or on SIGHUP).
+_CONFIG_MAX_AGE_SECONDS = 60
+
+
+@lru_cache(maxsize=1)
+def _load_config_for_window(window: int) -> Config:
+    return load_config()
+
+
+def get_cached_config() -> Config:
+    """Return load_config(), re-reading the file at most once per _CONFIG_MAX_AGE_SECONDS."""
+    return _load_config_for_window(int(time.monotonic() // _CONFIG_MAX_AGE_SECONDS))
+
+
+if hasattr(signal, "SIGHUP"):
+    try:
+        signal.signal(
+            signal.SIGHUP,
+            lambda *_: (_load_config_for_window.cache_clear(), _get_guard.cache_clear(), check_tesseract.cache_clear()),
+        )
+    except ValueError:  # pragma: no cover - not imported from the main thread
+        pass
+
+
+@lru_cache(maxsize=32)
+def _get_guard(modules: Tuple[str, ...], threshold: float, languages: Tuple[str, ...]) -> ImageGuard:
+    """Return a shared ImageGuard per parameter set; rebuilt after SIGHUP (analyze() keeps no per-call state)."""
+    return ImageGuard(modules=list(modules), threshold=threshold, languages=list(languages), config=get_cached_config())
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (numpy-aware) when it is installed."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+app = FastAPI(title="ImageGuard", version="0.2.0", default_response_class=FastJSONResponse)
 
 # CORS middleware
 if _config.api and _config.api.cors_origins:
@@ -36,58 +92,52 @@ if _config.api and _config.api.cors_origins:
     )
 
 # --- Prometheus Metrics ---
-_metrics = {
-    "requests_total": defaultdict(int),
-    "requests_duration_seconds": defaultdict(list),
-    "requests_in_progress": 0,
-    "analysis_total": 0,
-    "analysis_by_classification": defaultdict(int),
-}
-
-
-def _format_prometheus_metrics() -> str:
-    """Format metrics in Prometheus exposition format."""
-    lines = []
-
-    # Request counters by endpoint
-    lines.append("# HELP imageguard_requests_total Total number of requests")
-    lines.append("# TYPE imageguard_requests_total counter")
-    for endpoint, count in _metrics["requests_total"].items():
-        lines.append(f'imageguard_requests_total{{endpoint="{endpoint}"}} {count}')
-
-    # Request duration histogram (simplified as summary)
-    lines.append("# HELP imageguard_request_duration_seconds Request duration in seconds")
-    lines.append("# TYPE imageguard_request_duration_seconds summary")
-    for endpoint, durations in _metrics["requests_duration_seconds"].items():
-        if durations:
-            avg = sum(durations[-100:]) / len(durations[-100:])  # Last 100 requests
-            lines.append(f'imageguard_request_duration_seconds_sum{{endpoint="{endpoint}"}} {sum(durations[-100:]):.4f}')
-            lines.append(f'imageguard_request_duration_seconds_count{{endpoint="{endpoint}"}} {len(durations[-100:])}')
-
-    # Analysis counters
-    lines.append("# HELP imageguard_analysis_total Total number of image analyses")
-    lines.append("# TYPE imageguard_analysis_total counter")
-    lines.append(f"imageguard_analysis_total {_metrics['analysis_total']}")
-
-    lines.append("# HELP imageguard_analysis_by_classification Analysis results by classification")
-    lines.append("# TYPE imageguard_analysis_by_classification counter")
-    for classification, count in _metrics["analysis_by_classification"].items():
-        lines.append(f'imageguard_analysis_by_classification{{classification="{classification}"}} {count}')
-
-    # Requests in progress gauge
-    lines.append("# HELP imageguard_requests_in_progress Current number of requests being processed")
-    lines.append("# TYPE imageguard_requests_in_progress gauge")
-    lines.append(f"imageguard_requests_in_progress {_metrics['requests_in_progress']}")
-
-    return "\n".join(lines) + "\n"
+REQUESTS = Counter("imageguard_requests", "Total number of requests", ["endpoint"])
+REQUEST_DURATION = Histogram("imageguard_request_duration_seconds", "Request duration in seconds", ["endpoint"])
+REQUESTS_IN_PROGRESS = Gauge(
+    "imageguard_requests_in_progress", "Current number of requests being processed", multiprocess_mode="livesum"
+)
+ANALYSES = Counter("imageguard_analysis", "Total number of image analyses")
+ANALYSES_BY_CLASSIFICATION = Counter(
+    "imageguard_analysis_by_classification", "Analysis results by classification", ["classification"]
+)
+
+
+def _endpoint_label(request: Request) -> str:
+    """Metric label for a request: its route template, so arbitrary URLs can't create new series."""
+    route_path = getattr(request.scope.get("route"), "path", None)
+    if route_path is None:
+        return "unmatched"
+    # Routes shared via the router may report their unprefixed template; keep /api/v1 series distinct.
+    if request.url.path.startswith(API_PREFIX + "/") and not route_path.startswith(API_PREFIX + "/"):
+        return API_PREFIX + route_path
+    return route_path
+
+
+def _record_analysis(result: dict) -> None:
+    ANALYSES.inc()
+    ANALYSES_BY_CLASSIFICATION.labels(result.get("result", {}).get("classification", "UNKNOWN")).inc()
+
+
+def _metrics_payload() -> bytes:
+    """Render metrics; under multi-worker uvicorn, aggregate every worker's PROMETHEUS_MULTIPROC_DIR files."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
 
 
 # --- Rate Limiting ---
-_rate_limit_store: dict[str, list[float]] = defaultdict(list)
+_rate_limit_store: dict[str, deque[float]] = defaultdict(deque)
+# Sweep clients with no requests in the current window every this many checks.
+_RATE_LIMIT_GC_INTERVAL = 1024
+_rate_limit_checks = 0
 
 
 def _check_rate_limit(client_ip: str) -> bool:
     """Check if client has exceeded rate limit. Returns True if allowed."""
+    global _rate_limit_checks
     if not _config.api or not _config.api.rate_limit_enabled:
         return True
 
@@ -95,18 +145,75 @@ def _check_rate_limit(client_ip: str) -> bool:
     window = _config.api.rate_limit_window_seconds
     max_requests = _config.api.rate_limit_requests
 
-    # Clean old entries
-    _rate_limit_store[client_ip] = [
-        ts for ts in _rate_limit_store[client_ip] if now - ts < window
-    ]
+    _rate_limit_checks += 1
+    if _rate_limit_checks % _RATE_LIMIT_GC_INTERVAL == 0:
+        _gc_rate_limit_store(now, window)
 
-    if len(_rate_limit_store[client_ip]) >= max_requests:
+    # Timestamps are appended in order, so expired entries are always at the left.
+    timestamps = _rate_limit_store[client_ip]
+    while timestamps and now - timestamps[0] >= window:
+        timestamps.popleft()
+
+    if len(timestamps) >= max_requests:
         return False
 
-    _rate_limit_store[client_ip].append(now)
+    timestamps.append(now)
     return True
 
 
+def _gc_rate_limit_store(now: float, window: float) -> None:
+    """Drop clients whose newest request is outside the window (e.g. one-shot IPs)."""
+    stale = [ip for ip, timestamps in _rate_limit_store.items() if not timestamps or now - timestamps[-1] >= window]
+    for ip in stale:
+        del _rate_limit_store[ip]
+
+
+# Sliding-window limiter shared by all workers: trim, count and record atomically per client.
+_RATE_LIMIT_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return 1
+"""
+
+
+def _make_redis_rate_limiter():
+    """Return a Redis Lua script handle when api.redis_url is set (redis is optional)."""
+    url = _config.api.redis_url if _config.api else None
+    if not url:
+        return None
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError:
+        logger.warning("api.redis_url is set but the redis package is not installed; using in-process rate limiting")
+        return None
+    return redis_asyncio.from_url(url).register_script(_RATE_LIMIT_LUA)
+
+
+_redis_rate_limit = _make_redis_rate_limiter()
+
+
+async def _allow_request(client_ip: str) -> bool:
+    """Rate-limit check shared across workers via Redis, falling back to the in-process store."""
+    if _redis_rate_limit is None or not _config.api.rate_limit_enabled:
+        return _check_rate_limit(client_ip)
+    now = time.time()
+    try:
+        allowed = await _redis_rate_limit(
+            keys=[f"imageguard:ratelimit:{client_ip}"],
+            args=[now, _config.api.rate_limit_window_seconds, _config.api.rate_limit_requests, f"{now}:{uuid.uuid4().hex}"],
+        )
+        return bool(allowed)
+    except Exception:
+        logger.warning("Redis rate limiter unavailable; falling back to in-process limits", exc_info=True)
+        return _check_rate_limit(client_ip)
+
+
 def get_client_ip(request: Request) -> str:
     """Extract client IP from request."""
     forwarded = request.headers.get("X-Forwarded-For")
@@ -115,6 +222,39 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
+# --- Upload limits ---
+MAX_BATCH_SIZE = 10
+# Allowance for multipart boundaries/headers on top of the image bytes.
+_FORM_OVERHEAD_BYTES = 64 * 1024
+_MAX_IMAGE_BYTES = _config.max_image_size_mb * 1024 * 1024
+_analysis_semaphore = asyncio.Semaphore(_config.api.max_concurrent_analyses if _config.api else 4)
+
+
+def _max_request_bytes(path: str) -> Optional[int]:
+    """Upper bound on the request body for upload endpoints (None for other paths)."""
+    if path.endswith("/analyze/batch"):
+        return MAX_BATCH_SIZE * (_MAX_IMAGE_BYTES + _FORM_OVERHEAD_BYTES)
+    if path.endswith("/analyze"):
+        return _MAX_IMAGE_BYTES + _FORM_OVERHEAD_BYTES
+    return None
+
+
+def _check_upload_size(image: UploadFile) -> None:
+    """Reject an upload larger than max_image_size_mb before it is decoded."""
+    size = image.size
+    if size is None:
+        size = image.file.seek(0, os.SEEK_END)
+        image.file.seek(0)
+    if size > _MAX_IMAGE_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image exceeds {_config.max_image_size_mb} MB limit")
+
+
+def _check_upload_format(image: UploadFile) -> None:
+    """Reject an upload whose leading bytes match no supported image format before it is decoded."""
+    if sniff_image_format(image.file) is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported image format: {image.filename or 'upload'}")
+
+
 # --- API Key Authentication ---
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
@@ -141,50 +281,53 @@ async def metrics_and_rate_limit_middleware(request: Request, call_next):
     client_ip = get_client_ip(request)
     endpoint = request.url.path
 
+    # Reject oversized uploads from Content-Length before the multipart body is spooled.
+    max_request_bytes = _max_request_bytes(endpoint) if request.method == "POST" else None
+    content_length = request.headers.get("content-length")
+    if max_request_bytes is not None and content_length and content_length.isdigit() and int(content_length) > max_request_bytes:
+        return JSONResponse(status_code=413, content={"error": "Request body too large"})
+
     # Skip rate limiting for health and metrics endpoints
     skip_rate_limit = endpoint in ["/health", "/api/v1/health", "/metrics", "/api/v1/metrics"]
 
-    if not skip_rate_limit and not _check_rate_limit(client_ip):
+    if not skip_rate_limit and not await _allow_request(client_ip):
         return JSONResponse(
             status_code=429,
             content={"error": "Rate limit exceeded", "retry_after_seconds": _config.api.rate_limit_window_seconds}
         )
 
     # Track metrics
-    _metrics["requests_total"][endpoint] += 1
-    _metrics["requests_in_progress"] += 1
-    start_time = time.time()
-
-    try:
-        response = await call_next(request)
-        return response
-    finally:
-        duration = time.time() - start_time
-        _metrics["requests_duration_seconds"][endpoint].append(duration)
-        _metrics["requests_in_progress"] -= 1
+    start_time = time.perf_counter()
+    with REQUESTS_IN_PROGRESS.track_inprogress():
+        try:
+            return await call_next(request)
+        finally:
+            label = _endpoint_label(request)
+            REQUESTS.labels(label).inc()
+            REQUEST_DURATION.labels(label).observe(time.perf_counter() - start_time)
 
 
+@lru_cache(maxsize=1)
 def check_tesseract() -> bool:
-    import subprocess
+    """Whether the tesseract binary is on PATH; looked up once per process (again after SIGHUP), without forking."""
+    return shutil.which("tesseract") is not None
 
-    try:
-        subprocess.run(["tesseract", "--version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=3)
-        return True
-    except Exception:
-        return False
+
+# Endpoints are declared once and mounted both at the root and under API_PREFIX.
+router = APIRouter()
 
 
-@app.get("/api/v1/health")
-@app.get("/health")
+@router.get("/health")
 def health():
-    cfg = load_config()
+    cfg = get_cached_config()
     pattern_path = cfg.modules.get("text_extraction").pattern_path if cfg.modules and cfg.modules.get("text_extraction") else None
     freq_baseline = cfg.modules.get("frequency_analysis").baseline_model if cfg.modules and cfg.modules.get("frequency_analysis") else None
+    tesseract_ok = check_tesseract()
     return {
-        "status": "healthy" if check_tesseract() else "degraded",
+        "status": "healthy" if tesseract_ok else "degraded",
         "version": app.version,
         "modules_loaded": SUPPORTED_INPUT_MODULES,
-        "tesseract": check_tesseract(),
+        "tesseract": tesseract_ok,
         "pattern_db": Path(pattern_path).exists() if pattern_path else False,
         "frequency_baseline": Path(freq_baseline).exists() if freq_baseline else False,
         "rate_limiting": cfg.api.rate_limit_enabled if cfg.api else False,
@@ -192,17 +335,21 @@ def health():
     }
 
 
-@app.get("/api/v1/metrics")
-@app.get("/metrics")
+@router.get("/metrics")
 def metrics():
     """Prometheus metrics endpoint."""
     if not _config.api or not _config.api.metrics_enabled:
         raise HTTPException(status_code=404, detail="Metrics disabled")
-    return PlainTextResponse(_format_prometheus_metrics(), media_type="text/plain")
+    return Response(_metrics_payload(), media_type=CONTENT_TYPE_LATEST)
+
 
+# Worker threads for analysis, so decoding and scoring never block the event loop. Analysis is
+# dominated by OpenCV/NumPy and tesseract subprocesses, which release the GIL, so threads
+# parallelize it without pickling ImageGuard.
+_analysis_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="imageguard-analysis")
 
-@app.post("/api/v1/analyze")
-@app.post("/analyze")
+
+@router.post("/analyze")
 async def analyze(
     request: Request,
     image: UploadFile = File(...),
@@ -214,46 +361,37 @@ async def analyze(
     max_text_length: Optional[int] = None,
     _api_key: str = Depends(verify_api_key),
 ):
-    requested_modules: List[str] = [m for m in (modules or "all").split(",") if m]
-    languages_list: List[str] = [l for l in (languages or "eng").split(",") if l]
-
     try:
-        guard = ImageGuard(modules=requested_modules, threshold=threshold, languages=languages_list)
+        guard = _get_guard(tuple(sorted(parse_csv(modules, "all"))), threshold, parse_csv(languages, "eng"))
     except ValueError as exc:
         return JSONResponse({"error": str(exc)}, status_code=400)
 
-    # Write upload to temp file for PIL/OpenCV compatibility.
-    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(image.filename).suffix or ".img") as tmp:
-        temp_path = Path(tmp.name)
-        await image.seek(0)
-        shutil.copyfileobj(image.file, tmp)
-
+    # Decode straight from the upload's spooled buffer; no temp file round-trip.
+    _check_upload_size(image)
+    await image.seek(0)
+    _check_upload_format(image)
     try:
-        result = guard.analyze(
-            str(temp_path),
+        analyze_upload = partial(
+            guard.analyze,
+            image.file,
             return_marked=return_marked,
             include_text=include_text,
             max_text_length=max_text_length,
+            filename=image.filename,
         )
+        async with _analysis_semaphore:
+            result = await asyncio.get_running_loop().run_in_executor(_analysis_executor, analyze_upload)
 
-        # Update metrics
-        _metrics["analysis_total"] += 1
-        classification = result.get("result", {}).get("classification", "UNKNOWN")
-        _metrics["analysis_by_classification"][classification] += 1
+        _record_analysis(result)
 
     except Exception as exc:
         return JSONResponse({"error": str(exc)}, status_code=400)
-    finally:
-        try:
-            temp_path.unlink(missing_ok=True)
-        except Exception:
-            pass
 
-    return result
+    # Returned as a response object so numpy values skip jsonable_encoder and go straight to orjson.
+    return FastJSONResponse(result)
 
 
-@app.post("/api/v1/analyze/batch")
-@app.post("/analyze/batch")
+@router.post("/analyze/batch")
 async def analyze_batch(
     request: Request,
     images: List[UploadFile] = File(...),
@@ -263,37 +401,29 @@ async def analyze_batch(
     _api_key: str = Depends(verify_api_key),
 ):
     # Check batch size limit
-    max_batch = 10
-    if len(images) > max_batch:
+    if len(images) > MAX_BATCH_SIZE:
         return JSONResponse(
-            {"error": f"Batch size exceeds limit of {max_batch} images"},
+            {"error": f"Batch size exceeds limit of {MAX_BATCH_SIZE} images"},
             status_code=400
         )
 
-    requested_modules: List[str] = [m for m in (modules or "all").split(",") if m]
-    languages_list: List[str] = [l for l in (languages or "eng").split(",") if l]
-    guard = ImageGuard(modules=requested_modules, threshold=threshold, languages=languages_list)
+    guard = _get_guard(tuple(sorted(parse_csv(modules, "all"))), threshold, parse_csv(languages, "eng"))
 
-    results = []
-    for image in images:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(image.filename).suffix or ".img") as tmp:
-            temp_path = Path(tmp.name)
-            await image.seek(0)
-            shutil.copyfileobj(image.file, tmp)
-        try:
-            result = guard.analyze(str(temp_path))
-            results.append(result)
+    # Analyze the images concurrently off the event loop, sharing one ImageGuard.
+    loop = asyncio.get_running_loop()
 
-            # Update metrics
-            _metrics["analysis_total"] += 1
-            classification = result.get("result", {}).get("classification", "UNKNOWN")
-            _metrics["analysis_by_classification"][classification] += 1
+    async def run(image: UploadFile):
+        async with _analysis_semaphore:
+            return await loop.run_in_executor(_analysis_executor, partial(guard.analyze, image.file, filename=image.filename))
 
-        finally:
-            try:
-                temp_path.unlink(missing_ok=True)
-            except Exception:
-                pass
+    for image in images:
+        _check_upload_size(image)
+        await image.seek(0)
+        _check_upload_format(image)
+    results = list(await asyncio.gather(*(run(image) for image in images)))
+
+    for result in results:
+        _record_analysis(result)
 
     summary = {
         "safe": sum(1 for r in results if r.get("result", {}).get("classification") == "SAFE"),
@@ -301,13 +431,14 @@ async def analyze_batch(
         "dangerous": sum(1 for r in results if r.get("result", {}).get("classification") == "DANGEROUS"),
         "average_processing_time_ms": int(sum(r.get("processing_time_ms", 0) for r in results) / max(len(results), 1)),
     }
-    return {"batch_id": str(uuid.uuid4()), "total_images": len(results), "results": results, "summary": summary}
+    return FastJSONResponse(
+        {"batch_id": str(uuid.uuid4()), "total_images": len(results), "results": results, "summary": summary}
+    )
 
 
-@app.get("/api/v1/config")
-@app.get("/config")
+@router.get("/config")
 def get_config(_api_key: str = Depends(verify_api_key)):
-    cfg = load_config()
+    cfg = get_cached_config()
     return {
         "general": {
             "max_image_size_mb": cfg.max_image_size_mb,
@@ -328,15 +459,17 @@ def get_config(_api_key: str = Depends(verify_api_key)):
     }
 
 
-@app.get("/api/v1/patterns")
-@app.get("/patterns")
+@router.get("/patterns")
 def get_patterns(_api_key: str = Depends(verify_api_key)):
     pattern_path = None
-    cfg = load_config()
+    cfg = get_cached_config()
     if cfg.modules and "text_extraction" in cfg.modules:
         pattern_path = cfg.modules["text_extraction"].pattern_path
     try:
-        with open(pattern_path or "patterns.yaml", "r", encoding="utf-8") as f:
-            return yaml.safe_load(f) or {}
+        return load_patterns_document(pattern_path or "patterns.yaml")
     except Exception:
         return {"patterns": []}
+
+
+app.include_router(router, prefix=API_PREFIX)
+app.include_router(router)
@@ -4,28 +4,56 @@ from __future__ import annotations
 
 import json
 import math
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+import numpy as np
+
+# Scores are quantized to this many bins per unit before the sigmoid so repeated
+# scores hit the cache; matches the 4-decimal precision scores are reported at.
+_SCORE_BINS = 10_000
+
+
+@lru_cache(maxsize=8)
+def _load_calibration_cached(path: str, mtime_ns: int) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 
 def load_calibration(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Load calibration JSON, cached by path and mtime (treat the result as read-only)."""
     if not path:
         return None
     p = Path(path)
-    if not p.exists():
-        return None
     try:
-        with p.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        return _load_calibration_cached(str(p), p.stat().st_mtime_ns)
     except Exception:
         return None
 
 
+@lru_cache(maxsize=4096)
+def _sigmoid(score_q: int, A: float, B: float) -> float:
+    return 1.0 / (1.0 + math.exp(A * score_q / _SCORE_BINS + B))
+
+
+def _platt_params(calibration: Dict[str, Any]) -> tuple:
+    params = calibration.get("platt_parameters", {})
+    return float(params.get("A")), float(params.get("B"))
+
+
 def platt_confidence(score: float, calibration: Dict[str, Any]) -> Optional[float]:
     try:
-        params = calibration.get("platt_parameters", {})
-        A = float(params.get("A"))
-        B = float(params.get("B"))
-        return 1.0 / (1.0 + math.exp(A * score + B))
+        A, B = _platt_params(calibration)
+        return _sigmoid(int(round(score * _SCORE_BINS)), A, B)
+    except Exception:
+        return None
+
+
+def platt_confidence_batch(scores: Any, calibration: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Vectorized ``platt_confidence`` over an array of scores (unquantized)."""
+    try:
+        A, B = _platt_params(calibration)
+        return 1.0 / (1.0 + np.exp(A * np.asarray(scores, dtype=np.float64) + B))
     except Exception:
         return None
@@ -3,26 +3,13 @@
 from __future__ import annotations
 
 import argparse
-import json
 import sys
 from pathlib import Path
 from typing import List
 
-import numpy as np
-
 from .analyzer import ImageGuard
-
-
-class NumpyEncoder(json.JSONEncoder):
-    """JSON encoder that handles numpy types."""
-    def default(self, obj):
-        if isinstance(obj, np.floating):
-            return float(obj)
-        if isinstance(obj, np.integer):
-            return int(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super().default(obj)
+from .config import parse_csv
+from .serialization import NumpyEncoder, dumps  # noqa: F401 - NumpyEncoder re-exported for compatibility
 
 
 def parse_args(argv: List[str]) -> argparse.Namespace:
@@ -64,8 +51,8 @@ Examples:
 
 def main(argv: List[str] | None = None) -> int:
     args = parse_args(argv or sys.argv[1:])
-    modules = [m.strip() for m in args.modules.split(",") if m.strip()]
-    languages = [l.strip() for l in args.languages.split(",") if l.strip()]
+    modules = list(parse_csv(args.modules, "all"))
+    languages = list(parse_csv(args.languages, "eng"))
 
     try:
         guard = ImageGuard(modules=modules, threshold=args.threshold, languages=languages)
@@ -79,10 +66,7 @@ def main(argv: List[str] | None = None) -> int:
         sys.stderr.write(f"Error: {exc}\n")
         return 1
 
-    if args.pretty:
-        print(json.dumps(result, indent=2, cls=NumpyEncoder))
-    else:
-        print(json.dumps(result, cls=NumpyEncoder))
+    print(dumps(result, pretty=args.pretty).decode("utf-8"))
     return 0
 
 
@@ -2,12 +2,17 @@
 
 from __future__ import annotations
 
+import hashlib
 import os
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
 import yaml
 
+# libyaml's C loader when PyYAML was built with it; same safe semantics, much faster.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 @dataclass
 class Thresholds:
@@ -38,6 +43,7 @@ class ModuleConfig:
     wavelet_threshold: float = 0.5
     wavelet_type: str = "haar"
     wavelet_levels: int = 1
+    tile_size: int = 0  # frequency analysis tile edge in pixels; 0 analyzes the whole image
     lsb_analysis: bool = True
     chi_square_test: bool = True
     rs_analysis: bool = True
@@ -52,6 +58,10 @@ class ModuleConfig:
 class OutputConfig:
     include_extracted_text: bool = True
     max_text_length: int = 10000
+    # zlib level for the temporary marked PNG; 1 is fast, raise to 6-9 for smaller files.
+    marked_compress_level: int = 1
+    # Directory for marked images (e.g. /dev/shm to keep them off disk); None uses the system default.
+    temp_dir: Optional[str] = None
 
 
 @dataclass
@@ -65,6 +75,8 @@ class ApiConfig:
     rate_limit_window_seconds: int = 60
     cors_origins: List[str] | None = None
     metrics_enabled: bool = True
+    max_concurrent_analyses: int = 4  # analyses running at once per worker process
+    redis_url: str | None = None  # shared rate-limit store across workers (requires redis)
 
 
 @dataclass
@@ -76,6 +88,8 @@ class Config:
     calibration_data: str | None = None
     modules: Dict[str, ModuleConfig] | None = None
     fail_open: bool = True
+    # Stop remaining modules once the finished ones alone guarantee a DANGEROUS result.
+    early_exit: bool = False
     output: OutputConfig = None  # type: ignore
     api: ApiConfig = None  # type: ignore
 
@@ -88,7 +102,19 @@ class Config:
             self.api = ApiConfig()
 
 
+_FIELD_NAMES = {cls: frozenset(f.name for f in fields(cls)) for cls in (Thresholds, ModuleConfig, OutputConfig, ApiConfig, Config)}
+# Config fields that come from their own YAML sections rather than ``general``.
+_NESTED_CONFIG_FIELDS = ("thresholds", "calibration_data", "modules", "output", "api")
+
+
+@lru_cache(maxsize=256)
+def parse_csv(value: Optional[str], default: str) -> Tuple[str, ...]:
+    """Split a comma-separated option (e.g. modules or languages) into a cached tuple."""
+    return tuple(item for item in (part.strip() for part in (value or default).split(",")) if item)
+
+
 def load_config(path: str | None = None) -> Config:
+    """Load the YAML config, cached by path and mtime (the returned Config is shared; treat it as read-only)."""
     path = path or os.environ.get("IMAGEGUARD_CONFIG", "config.yaml")
     if not os.path.exists(path):
         return Config(
@@ -123,80 +149,59 @@ def load_config(path: str | None = None) -> Config:
                 ),
             }
         )
-    with open(path, "r", encoding="utf-8") as f:
-        raw = yaml.safe_load(f) or {}
-    scoring = raw.get("scoring", {})
-    th = scoring.get("thresholds", {})
-    thresholds = Thresholds(
-        safe=th.get("safe", 0.4),
-        suspicious=th.get("suspicious", 0.6),
-        dangerous=th.get("dangerous", 0.6),
-    )
+    return _load_config_cached(path, os.stat(path).st_mtime_ns, os.environ.get("IMAGEGUARD_API_KEYS", ""))
 
-    modules_cfg: Dict[str, ModuleConfig] = {}
-    modules = raw.get("modules", {})
-    for name, cfg in modules.items():
-        modules_cfg[name] = ModuleConfig(
-            enabled=cfg.get("enabled", True),
-            weight=cfg.get("weight", 1.0),
-            languages=cfg.get("languages"),
-            thresholds=cfg.get("thresholds"),
-            contrast_thresholds=cfg.get("contrast_thresholds"),
-            wavelet_enabled=cfg.get("wavelet_enabled", True),
-            pattern_path=cfg.get("pattern_path"),
-            baseline_model=cfg.get("baseline_model"),
-            tesseract_cmd=cfg.get("tesseract_cmd"),
-            analyze_corners=cfg.get("analyze_corners", True),
-            analyze_borders=cfg.get("analyze_borders", True),
-            edge_density_threshold=cfg.get("edge_density_threshold", 0.15),
-            edge_grid_size=cfg.get("edge_grid_size", 4),
-            fft_enabled=cfg.get("fft_enabled", True),
-            dct_enabled=cfg.get("dct_enabled", True),
-            fft_threshold=cfg.get("fft_threshold", 0.7),
-            dct_threshold=cfg.get("dct_threshold", 0.6),
-            wavelet_threshold=cfg.get("wavelet_threshold", 0.5),
-            wavelet_type=cfg.get("wavelet_type", "haar"),
-            wavelet_levels=cfg.get("wavelet_levels", 1),
-            lsb_analysis=cfg.get("lsb_analysis", True),
-            chi_square_test=cfg.get("chi_square_test", True),
-            rs_analysis=cfg.get("rs_analysis", True),
-            spa_analysis=cfg.get("spa_analysis", False),
-            detect_qr=cfg.get("detect_qr", True),
-            detect_barcodes=cfg.get("detect_barcodes", True),
-            detect_screenshots=cfg.get("detect_screenshots", True),
-            analyze_decoded_content=cfg.get("analyze_decoded_content", True),
-        )
+
+@lru_cache(maxsize=8)
+def _load_config_cached(path: str, mtime_ns: int, env_keys: str) -> Config:
+    with open(path, "rb") as f:
+        data = f.read()
+    if not env_keys:
+        compiled = _precompiled_config(hashlib.sha256(data).hexdigest())
+        if compiled is not None:
+            return compiled
+    return _build_config(yaml.load(data, Loader=_YamlLoader) or {}, env_keys)
+
+
+def _precompiled_config(source_sha256: str) -> Optional[Config]:
+    """Config emitted by scripts/compile_config.py, if it was compiled from exactly this YAML."""
+    try:
+        from ._config_generated import CONFIG, SOURCE_SHA256
+    except ImportError:
+        return None
+    return CONFIG if SOURCE_SHA256 == source_sha256 else None
+
+
+def _fields_of(cls, values: Dict, exclude: Tuple[str, ...] = ()) -> Dict:
+    """Keep only the keys of ``values`` that are fields of dataclass ``cls``; unset ones use its defaults."""
+    names = _FIELD_NAMES[cls]
+    return {k: v for k, v in values.items() if k in names and k not in exclude}
+
+
+def _build_config(raw: Dict, env_keys: str) -> Config:
+    scoring = raw.get("scoring", {})
+    thresholds = Thresholds(**_fields_of(Thresholds, scoring.get("thresholds", {})))
+    modules_cfg: Dict[str, ModuleConfig] = {
+        name: ModuleConfig(**_fields_of(ModuleConfig, cfg)) for name, cfg in raw.get("modules", {}).items()
+    }
     general = raw.get("general", {})
     output_cfg = raw.get("output", {})
     api_cfg = raw.get("api", {})
 
     # Load API keys from env var if not in config
     api_keys = api_cfg.get("api_keys", [])
-    env_keys = os.environ.get("IMAGEGUARD_API_KEYS", "")
     if env_keys:
         api_keys = [k.strip() for k in env_keys.split(",") if k.strip()]
 
     return Config(
-        max_image_size_mb=general.get("max_image_size_mb", 50),
-        target_resolution=general.get("target_resolution", 1920),
-        timeout_seconds=general.get("timeout_seconds", 30),
+        **_fields_of(Config, general, exclude=_NESTED_CONFIG_FIELDS),
         thresholds=thresholds,
         calibration_data=scoring.get("calibration_data"),
         modules=modules_cfg,
-        fail_open=general.get("fail_open", True),
-        output=OutputConfig(
-            include_extracted_text=output_cfg.get("include_extracted_text", True),
-            max_text_length=output_cfg.get("max_text_length", 10000),
-        ),
+        output=OutputConfig(**_fields_of(OutputConfig, output_cfg)),
         api=ApiConfig(
-            host=api_cfg.get("host", "0.0.0.0"),
-            port=api_cfg.get("port", 8080),
-            require_api_key=api_cfg.get("require_api_key", False),
+            **_fields_of(ApiConfig, api_cfg, exclude=("api_keys", "cors_origins")),
             api_keys=api_keys if api_keys else None,
-            rate_limit_enabled=api_cfg.get("rate_limit_enabled", True),
-            rate_limit_requests=api_cfg.get("rate_limit_requests", 100),
-            rate_limit_window_seconds=api_cfg.get("rate_limit_window_seconds", 60),
             cors_origins=api_cfg.get("cors_origins", ["*"]),
-            metrics_enabled=api_cfg.get("metrics_enabled", True),
         ),
     )
@@ -3,15 +3,27 @@
 from __future__ import annotations
 
 import math
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, Optional, Tuple
 
 import cv2
 import numpy as np
 
-try:
-    import pywt
-except Exception:  # pragma: no cover - optional dependency
-    pywt = None
+from .preprocess import SharedArrays
+
+# Shared by all analyze_frequency calls: one thread per transform (FFT, DCT, wavelet).
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="imageguard-frequency")
+
+
+@lru_cache(maxsize=1)
+def _pywt():
+    """Import pywt on first wavelet analysis (it is slow to import); None if it is not installed."""
+    try:
+        import pywt
+    except Exception:  # pragma: no cover - optional dependency
+        return None
+    return pywt
 
 
 def pil_to_gray_f(image) -> np.ndarray:
@@ -25,19 +37,39 @@ def pil_to_gray_f(image) -> np.ndarray:
     return arr.astype(np.float32) / 255.0
 
 
+@lru_cache(maxsize=8)
+def _rfft_layout(h: int, w: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Column weights plus flat indices/weights of the low-frequency disc in the rfft2 of an (h, w) image.
+
+    rfft2 keeps only columns kx >= 0 of a real input's Hermitian spectrum; columns whose
+    mirror (-kx) was dropped count twice so energies match the full, shifted fft2.
+    """
+    cols = w // 2 + 1
+    col_weight = np.full(cols, 2.0, dtype=np.float32)
+    col_weight[0] = 1.0
+    if w % 2 == 0:
+        col_weight[-1] = 1.0
+    radius = min(h // 2, w // 2) // 4
+    ky = np.fft.fftfreq(h, 1.0 / h)[:, None]
+    kx = np.arange(cols)[None, :]
+    low_idx = np.flatnonzero(kx**2 + ky**2 <= radius**2)
+    low_weight = col_weight[low_idx % cols]
+    for arr in (col_weight, low_idx, low_weight):
+        arr.flags.writeable = False
+    return col_weight, low_idx, low_weight
+
+
 def fft_anomaly(gray: np.ndarray, threshold: float = 0.7) -> Dict:
-    f = np.fft.fft2(gray)
-    fshift = np.fft.fftshift(f)
-    mag = np.abs(fshift)
-    # Central low-frequency region
-    h, w = mag.shape
-    center_h, center_w = h // 2, w // 2
-    radius = min(center_h, center_w) // 4
-
-    y, x = np.ogrid[:h, :w]
-    mask = (x - center_w) ** 2 + (y - center_h) ** 2 <= radius**2
-    low_energy = mag[mask].sum() + 1e-8
-    high_energy = mag[~mask].sum() + 1e-8
+    h, w = gray.shape
+    col_weight, low_idx, low_weight = _rfft_layout(h, w)
+    # cv2.dft beats np.fft.rfft2 even though it fills the redundant half; only the rfft2
+    # columns (kx >= 0) of its interleaved complex output are kept.
+    spectrum = cv2.dft(np.ascontiguousarray(gray, dtype=np.float32), flags=cv2.DFT_COMPLEX_OUTPUT)
+    mag = np.abs(spectrum.view(np.complex64)[:, : col_weight.size, 0])
+    # Central low-frequency region vs everything else
+    low_sum = mag.ravel()[low_idx] @ low_weight
+    low_energy = low_sum + 1e-8
+    high_energy = mag.sum(axis=0) @ col_weight - low_sum + 1e-8
     ratio = high_energy / (low_energy + high_energy)
     # Map ratio to score with a soft threshold
     denom = max(1e-6, 1.0 - threshold)
@@ -45,6 +77,16 @@ def fft_anomaly(gray: np.ndarray, threshold: float = 0.7) -> Dict:
     return {"score": score, "high_freq_ratio": ratio}
 
 
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    m = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * math.sqrt(2.0 / n)
+    m[0] /= math.sqrt(2.0)
+    return m.astype(np.float32)
+
+
+_DCT8 = _dct_matrix(8)
+
+
 def dct_anomaly(gray: np.ndarray, threshold: float = 0.6) -> Dict:
     # Convert to 8x8 blocks like JPEG.
     h, w = gray.shape
@@ -53,16 +95,11 @@ def dct_anomaly(gray: np.ndarray, threshold: float = 0.6) -> Dict:
     blocks = gray.reshape(h8 // 8, 8, w8 // 8, 8).swapaxes(1, 2).reshape(-1, 8, 8)
     if blocks.size == 0:
         return {"score": 0.0, "hf_lf_ratio": 0.0}
-    hf_energy = []
-    lf_energy = []
-    for block in blocks:
-        dct = cv2.dct(block)
-        # low-frequency coefficients: top-left 2x2
-        lf = np.abs(dct[:2, :2]).mean()
-        # high-frequency coefficients: rest
-        hf = np.abs(dct[2:, 2:]).mean()
-        hf_energy.append(hf)
-        lf_energy.append(lf)
+    # Orthonormal 8x8 DCT-II of every block at once (same result as cv2.dct per block).
+    dct = _DCT8 @ blocks @ _DCT8.T
+    # low-frequency coefficients: top-left 2x2; high-frequency coefficients: rest
+    lf_energy = np.abs(dct[:, :2, :2]).mean(axis=(1, 2))
+    hf_energy = np.abs(dct[:, 2:, 2:]).mean(axis=(1, 2))
     lf_mean = np.mean(lf_energy) + 1e-6
     hf_mean = np.mean(hf_energy)
     ratio = hf_mean / (hf_mean + lf_mean)
@@ -71,20 +108,51 @@ def dct_anomaly(gray: np.ndarray, threshold: float = 0.6) -> Dict:
     return {"score": score, "hf_lf_ratio": ratio}
 
 
+def _mean_abs(arr: np.ndarray) -> float:
+    # L1 norm in one C pass, without the temporary np.abs() array.
+    return cv2.norm(np.ascontiguousarray(arr), cv2.NORM_L1) / arr.size
+
+
 def wavelet_anomaly(gray: np.ndarray, threshold: float = 0.5, wavelet_type: str = "haar", levels: int = 1) -> Dict:
+    pywt = _pywt()
     if pywt is None:
         return {"score": 0.0, "enabled": False}
     coeffs = pywt.wavedec2(gray, wavelet_type, level=levels)
     cA = coeffs[0]
     details = coeffs[1:]
-    detail_energy = sum(np.abs(c).mean() for level in details for c in level)
-    approx_energy = np.abs(cA).mean() + 1e-6
+    detail_energy = sum(_mean_abs(c) for level in details for c in level)
+    approx_energy = _mean_abs(cA) + 1e-6
     ratio = detail_energy / (detail_energy + approx_energy)
     denom = max(1e-6, 1.0 - threshold)
     score = max(0.0, min(1.0, (ratio - threshold) / denom))
     return {"score": score, "enabled": True, "detail_ratio": ratio, "wavelet_type": wavelet_type, "levels": levels}
 
 
+def _iter_tiles(gray: np.ndarray, tile_size: int) -> Iterator[np.ndarray]:
+    """Yield roughly tile_size x tile_size views covering ``gray`` without thin slivers."""
+    h, w = gray.shape
+    ys = np.linspace(0, h, max(1, round(h / tile_size)) + 1).astype(int)
+    xs = np.linspace(0, w, max(1, round(w / tile_size)) + 1).astype(int)
+    for y0, y1 in zip(ys[:-1], ys[1:]):
+        for x0, x1 in zip(xs[:-1], xs[1:]):
+            yield gray[y0:y1, x0:x1]
+
+
+def _tiled(fn: Callable[..., Dict], gray: np.ndarray, tile_size: int, **kwargs) -> Dict:
+    """Run ``fn`` per tile and combine float fields with an area-weighted mean."""
+    results = []
+    weights = []
+    for tile in _iter_tiles(gray, tile_size):
+        results.append(fn(tile, **kwargs))
+        weights.append(tile.size)
+    combined = dict(results[0])
+    for key, value in combined.items():
+        if isinstance(value, (float, np.floating)):
+            combined[key] = float(np.average([r[key] for r in results], weights=weights))
+    combined["tiles"] = len(results)
+    return combined
+
+
 def analyze_frequency(
     image,
     fft_enabled: bool = True,
@@ -96,15 +164,37 @@ def analyze_frequency(
     wavelet_type: str = "haar",
     wavelet_levels: int = 1,
     baseline: Optional[Dict] = None,
+    tile_size: int = 0,
 ) -> Dict:
-    gray = pil_to_gray_f(image)
+    """Score spectral anomalies.
+
+    With ``tile_size`` set, images larger than one tile are analyzed tile by tile and the
+    per-tile scores/ratios are combined with an area-weighted mean, which bounds the size
+    of the FFT and wavelet working arrays.
+    """
+    if isinstance(image, SharedArrays):
+        gray = image.gray_f32
+    else:
+        gray = pil_to_gray_f(image)
 
-    fft_res = fft_anomaly(gray, threshold=fft_threshold) if fft_enabled else {"score": 0.0, "disabled": True}
-    dct_res = dct_anomaly(gray, threshold=dct_threshold) if dct_enabled else {"score": 0.0, "disabled": True}
-    if wavelet_enabled:
-        wavelet_res = wavelet_anomaly(gray, threshold=wavelet_threshold, wavelet_type=wavelet_type, levels=wavelet_levels)
+    if tile_size and max(gray.shape) > tile_size:
+        def run(fn, **kwargs):
+            return _tiled(fn, gray, tile_size, **kwargs)
     else:
-        wavelet_res = {"score": 0.0, "enabled": False}
+        def run(fn, **kwargs):
+            return fn(gray, **kwargs)
+
+    # The transforms are independent and spend their time in GIL-releasing numpy/pywt code.
+    fft_future = _executor.submit(run, fft_anomaly, threshold=fft_threshold) if fft_enabled else None
+    dct_future = _executor.submit(run, dct_anomaly, threshold=dct_threshold) if dct_enabled else None
+    wavelet_future = None
+    if wavelet_enabled:
+        wavelet_future = _executor.submit(
+            run, wavelet_anomaly, threshold=wavelet_threshold, wavelet_type=wavelet_type, levels=wavelet_levels
+        )
+    fft_res = fft_future.result() if fft_future else {"score": 0.0, "disabled": True}
+    dct_res = dct_future.result() if dct_future else {"score": 0.0, "disabled": True}
+    wavelet_res = wavelet_future.result() if wavelet_future else {"score": 0.0, "enabled": False}
 
     # Baseline deviation adjustments (simple z-score like heuristic).
     if baseline:
@@ -3,8 +3,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
 
@@ -37,6 +39,15 @@ MODULE_LABELS = {
     "structural": "STRUCT",
 }
 
+# Minimum module score that produces an overlay in create_marked_image.
+OVERLAY_SCORE_THRESHOLDS = {
+    "text_extraction": 0.1,
+    "hidden_text": 0.3,
+    "frequency_analysis": 0.3,
+    "steganography": 0.3,
+    "structural": 0.3,
+}
+
 
 def get_severity_color(severity: float) -> Tuple[int, int, int, int]:
     """Get color based on severity level."""
@@ -58,6 +69,18 @@ def get_severity_outline(severity: float) -> Tuple[int, int, int]:
         return (244, 67, 54)  # Red
 
 
+@lru_cache(maxsize=1)
+def _load_fonts() -> Tuple[ImageFont.ImageFont, ImageFont.ImageFont]:
+    """Load the label fonts once per process, falling back to PIL's default font."""
+    try:
+        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 12)
+        small_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 10)
+    except Exception:
+        font = ImageFont.load_default()
+        small_font = font
+    return font, small_font
+
+
 def draw_flagged_regions(
     image: Image.Image,
     regions: List[FlaggedRegion],
@@ -77,26 +100,24 @@ def draw_flagged_regions(
     """
     # Create a copy with alpha channel for transparency
     marked = image.convert("RGBA")
-    overlay = Image.new("RGBA", marked.size, (0, 0, 0, 0))
+    # Paint the semi-transparent fills with array slicing; only outlines and labels go
+    # through ImageDraw. Rectangles include their right/bottom edge, as in ImageDraw.
+    fills = np.zeros((marked.height, marked.width, 4), dtype=np.uint8)
+    for region in regions:
+        x1 = max(0, region.x + region.width + 1)
+        y1 = max(0, region.y + region.height + 1)
+        fills[max(0, region.y) : y1, max(0, region.x) : x1] = get_severity_color(region.severity)
+    overlay = Image.fromarray(fills)
     draw = ImageDraw.Draw(overlay)
 
-    # Try to load a font, fall back to default
-    try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 12)
-        small_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 10)
-    except Exception:
-        font = ImageFont.load_default()
-        small_font = font
+    font, small_font = _load_fonts()
 
     # Draw each flagged region
     for region in regions:
-        color = get_severity_color(region.severity)
         outline = get_severity_outline(region.severity)
 
-        # Draw semi-transparent fill
         draw.rectangle(
             [region.x, region.y, region.x + region.width, region.y + region.height],
-            fill=color,
             outline=outline,
             width=2,
         )
@@ -225,6 +246,15 @@ def extract_text_regions(
     return regions
 
 
+def has_overlays(module_scores: dict) -> bool:
+    """Return True if create_marked_image would draw anything for these results."""
+    for module_name, threshold in OVERLAY_SCORE_THRESHOLDS.items():
+        result = module_scores.get(module_name)
+        if result and (result.get("score") or 0) > threshold:
+            return True
+    return False
+
+
 def create_marked_image(
     image: Image.Image,
     module_scores: dict,
@@ -247,7 +277,7 @@ def create_marked_image(
     # Extract text regions if text module was run
     if "text_extraction" in module_scores:
         text_result = module_scores["text_extraction"]
-        if text_result.get("score", 0) > 0.1:
+        if (text_result.get("score") or 0) > OVERLAY_SCORE_THRESHOLDS["text_extraction"]:
             text_regions = extract_text_regions(image, languages, tesseract_cmd=tesseract_cmd)
             # Adjust severity based on module score
             module_severity = text_result.get("score", 0.3)
@@ -259,8 +289,8 @@ def create_marked_image(
     for module_name in ["hidden_text", "frequency_analysis", "steganography", "structural"]:
         if module_name in module_scores:
             result = module_scores[module_name]
-            score = result.get("score", 0)
-            if score > 0.3:  # Only mark if suspicious
+            score = result.get("score") or 0
+            if score > OVERLAY_SCORE_THRESHOLDS[module_name]:  # Only mark if suspicious
                 # Add a corner indicator for full-image detections
                 regions.append(
                     FlaggedRegion(
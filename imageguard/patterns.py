@@ -2,9 +2,14 @@
 
 from __future__ import annotations
 
+import os
 import re
 import yaml
-from typing import List, Optional, Pattern
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+# libyaml's C loader when PyYAML was built with it; same safe semantics, much faster.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 class Pattern:
@@ -14,10 +19,11 @@ class Pattern:
         self.keywords = [k.lower() for k in keywords] if keywords else []
         self.severity = severity
 
-    def match(self, text: str) -> bool:
+    def match(self, text: str, lower_text: Optional[str] = None) -> bool:
         if self.regex and self.regex.search(text):
             return True
-        lower_text = text.lower()
+        if lower_text is None:
+            lower_text = text.lower()
         return any(k in lower_text for k in self.keywords)
 
 
@@ -78,25 +84,48 @@ DEFAULT_PATTERNS: List[Pattern] = [
 
 def find_matches(text: str, patterns: Optional[List[Pattern]] = None) -> List[Pattern]:
     patterns = patterns or DEFAULT_PATTERNS
-    return [p for p in patterns if p.match(text)]
+    # Lower-case once for every keyword pattern rather than once per pattern.
+    lower_text = text.lower()
+    return [p for p in patterns if p.match(text, lower_text)]
+
+
+@lru_cache(maxsize=8)
+def _load_document_cached(path: str, mtime_ns: int) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=_YamlLoader) or {}
+
+
+def load_patterns_document(path: str) -> Dict[str, Any]:
+    """Return the raw parsed patterns YAML, cached by path and mtime (treat as read-only)."""
+    return _load_document_cached(str(path), os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _load_patterns_cached(path: str, mtime_ns: int) -> Tuple[Pattern, ...]:
+    data = _load_document_cached(path, mtime_ns)
+    loaded: List[Pattern] = []
+    for entry in data.get("patterns", []):
+        loaded.append(
+            Pattern(
+                pattern_id=entry.get("id"),
+                regex=entry.get("regex"),
+                keywords=entry.get("keywords"),
+                severity=entry.get("severity", 0.5),
+            )
+        )
+    return tuple(loaded)
 
 
 def load_patterns(path: Optional[str]) -> List[Pattern]:
+    """Load patterns from a YAML file, falling back to DEFAULT_PATTERNS.
+
+    Parsed files are cached by path and mtime, so the returned Pattern objects are
+    shared between callers and must be treated as read-only.
+    """
     if not path:
         return DEFAULT_PATTERNS
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f) or {}
-        loaded: List[Pattern] = []
-        for entry in data.get("patterns", []):
-            loaded.append(
-                Pattern(
-                    pattern_id=entry.get("id"),
-                    regex=entry.get("regex"),
-                    keywords=entry.get("keywords"),
-                    severity=entry.get("severity", 0.5),
-                )
-            )
-        return loaded or DEFAULT_PATTERNS
+        loaded = _load_patterns_cached(str(path), os.stat(path).st_mtime_ns)
+        return list(loaded) or DEFAULT_PATTERNS
     except Exception:
         return DEFAULT_PATTERNS
@@ -4,9 +4,11 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import BinaryIO, Dict, List, Optional, Tuple
 
+import numpy as np
 from PIL import Image, ImageOps
 
 
@@ -30,6 +32,23 @@ MAGIC_BYTES = {
     "TIFF": [(b"II*\x00", "TIFF-LE"), (b"MM\x00*", "TIFF-BE")],
 }
 
+
+def _index_magic_prefixes() -> Dict[bytes, List[Tuple[bytes, str]]]:
+    """Bucket signatures by their first two bytes (every signature is at least that long).
+
+    WEBP is left out because its RIFF prefix is shared with other containers.
+    """
+    index: Dict[bytes, List[Tuple[bytes, str]]] = {}
+    for fmt, signatures in MAGIC_BYTES.items():
+        if fmt == "WEBP":
+            continue
+        for magic, _ in signatures:
+            index.setdefault(magic[:2], []).append((magic, fmt))
+    return index
+
+
+_MAGIC_BY_PREFIX = _index_magic_prefixes()
+
 # Extension to format mapping
 EXTENSION_TO_FORMAT = {
     ".jpg": "JPEG",
@@ -70,6 +89,11 @@ def validate_magic_bytes(path: Path, strict: bool = True) -> Tuple[bool, Optiona
     except Exception:
         return (False, None, expected_format)
 
+    return _check_magic(header, expected_format)
+
+
+def _check_magic(header: bytes, expected_format: str) -> Tuple[bool, Optional[str], Optional[str]]:
+    """Compare the first 12 bytes of a file against the format its extension claims."""
     if len(header) < 2:
         return (False, None, expected_format)
 
@@ -98,15 +122,20 @@ def _detect_format_from_magic(header: bytes) -> Optional[str]:
     if header[:4] == b"RIFF" and len(header) >= 12 and header[8:12] == b"WEBP":
         return "WEBP"
 
-    for fmt, signatures in MAGIC_BYTES.items():
-        if fmt == "WEBP":
-            continue  # Already handled above
-        for magic, _ in signatures:
-            if header.startswith(magic):
-                return fmt
+    for magic, fmt in _MAGIC_BY_PREFIX.get(header[:2], ()):
+        if header.startswith(magic):
+            return fmt
     return None
 
 
+def sniff_image_format(fp: BinaryIO) -> Optional[str]:
+    """Detect a seekable stream's image format from its first bytes, leaving the position unchanged."""
+    pos = fp.tell()
+    header = fp.read(12)
+    fp.seek(pos)
+    return _detect_format_from_magic(header)
+
+
 @dataclass
 class PreprocessedImage:
     image: Image.Image
@@ -119,19 +148,84 @@ class PreprocessedImage:
         return self.width * self.height
 
 
+@dataclass
+class SharedArrays:
+    """Pixel buffers derived once from the normalized image and shared by all analyzers.
+
+    Each array is computed on first access, so buffers no enabled analyzer reads are never
+    built. They are marked read-only; analyzers that need to modify pixels must copy first.
+    ``gray_f32`` is the grayscale image scaled to [0, 1]; ``enhanced`` and ``enhanced_edges``
+    are its contrast-equalized version and that version's edge map.
+    """
+
+    pil: Image.Image
+
+    @classmethod
+    def from_image(cls, image: Image.Image) -> "SharedArrays":
+        return cls(pil=image if image.mode == "RGB" else image.convert("RGB"))
+
+    # Analyzers run in parallel threads; a racing first access may build an array twice,
+    # but both copies are identical and one simply replaces the other.
+    @cached_property
+    def rgb(self) -> np.ndarray:
+        return _read_only(np.asarray(self.pil))
+
+    @cached_property
+    def gray_u8(self) -> np.ndarray:
+        return _read_only(np.asarray(self.pil.convert("L")))
+
+    @cached_property
+    def gray_f32(self) -> np.ndarray:
+        return _read_only(self.gray_u8.astype(np.float32) / 255.0)
+
+    @cached_property
+    def enhanced(self) -> np.ndarray:
+        """CLAHE-equalized ``gray_u8`` (clip 2.0, 8x8 tiles)."""
+        import cv2
+
+        return _read_only(cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(self.gray_u8))
+
+    @cached_property
+    def enhanced_edges(self) -> np.ndarray:
+        """Canny edge map (50/150) of ``enhanced``."""
+        import cv2
+
+        return _read_only(cv2.Canny(self.enhanced, 50, 150))
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    arr.flags.writeable = False
+    return arr
+
+
+def as_shared_arrays(image: Image.Image | SharedArrays) -> SharedArrays:
+    """Return ``image`` as SharedArrays, converting a bare PIL image if needed."""
+    if isinstance(image, SharedArrays):
+        return image
+    return SharedArrays.from_image(image)
+
+
 def load_image(
     path: str | os.PathLike,
     max_bytes: int = DEFAULT_MAX_BYTES,
     max_dimension: int = DEFAULT_MAX_DIMENSION,
     validate_magic: bool = True,
+    known_size: Optional[int] = None,
 ) -> PreprocessedImage:
-    path = Path(path)
-    if not path.exists():
-        raise FileNotFoundError(f"Image not found: {path}")
-    if path.is_dir():
-        raise ImageValidationError("Provided path is a directory, not an image")
+    """Load, validate and EXIF-orient an image as RGB.
 
-    size = path.stat().st_size
+    ``known_size`` is the file size from a stat the caller already did on a regular
+    file; passing it skips the existence/directory/size stat calls here.
+    """
+    path = Path(path)
+    if known_size is None:
+        if not path.exists():
+            raise FileNotFoundError(f"Image not found: {path}")
+        if path.is_dir():
+            raise ImageValidationError("Provided path is a directory, not an image")
+        size = path.stat().st_size
+    else:
+        size = known_size
     if size > max_bytes:
         raise ImageValidationError(f"Image size {size} exceeds max_bytes={max_bytes}")
 
@@ -139,20 +233,60 @@ def load_image(
     if validate_magic:
         is_valid, detected, expected = validate_magic_bytes(path)
         if not is_valid and expected:
-            detected_str = detected or "unknown"
-            raise ImageValidationError(
-                f"Magic byte mismatch: file extension suggests {expected}, "
-                f"but content appears to be {detected_str}"
-            )
+            _raise_magic_mismatch(detected, expected)
+
+    return _decode(path, max_dimension)
+
+
+def load_image_fileobj(
+    fp: BinaryIO,
+    filename: str | None = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    max_dimension: int = DEFAULT_MAX_DIMENSION,
+    validate_magic: bool = True,
+    known_size: Optional[int] = None,
+) -> PreprocessedImage:
+    """Load an image from a seekable binary stream (e.g. an upload buffer) without a temp file.
 
+    ``filename`` is only used for its extension when validating magic bytes.
+    """
+    start = fp.tell()
+    if known_size is None:
+        known_size = fp.seek(0, os.SEEK_END) - start
+        fp.seek(start)
+    if known_size > max_bytes:
+        raise ImageValidationError(f"Image size {known_size} exceeds max_bytes={max_bytes}")
+
+    expected_format = EXTENSION_TO_FORMAT.get(Path(filename).suffix.lower()) if filename else None
+    if validate_magic and expected_format:
+        header = fp.read(12)
+        fp.seek(start)
+        is_valid, detected, expected = _check_magic(header, expected_format)
+        if not is_valid:
+            _raise_magic_mismatch(detected, expected)
+
+    return _decode(fp, max_dimension)
+
+
+def _raise_magic_mismatch(detected: Optional[str], expected: str) -> None:
+    detected_str = detected or "unknown"
+    raise ImageValidationError(
+        f"Magic byte mismatch: file extension suggests {expected}, "
+        f"but content appears to be {detected_str}"
+    )
+
+
+def _decode(source: Path | BinaryIO, max_dimension: int) -> PreprocessedImage:
     try:
-        with Image.open(path) as img:
-            img.load()
-            format = img.format
-            if getattr(img, "is_animated", False):
-                raise ImageValidationError("Animated images are not supported")
+        with Image.open(source) as img:
+            # Image.open only parses the header, so these checks reject a file before any
+            # pixel data is decoded.
             if img.width > max_dimension or img.height > max_dimension:
                 raise ImageValidationError("Image dimensions exceed allowed maximum")
+            if getattr(img, "is_animated", False):
+                raise ImageValidationError("Animated images are not supported")
+            format = img.format
+            img.load()
             rgb = ImageOps.exif_transpose(img.convert("RGB"))
             return PreprocessedImage(image=rgb, original_format=format, width=rgb.width, height=rgb.height)
     except ImageValidationError:
@@ -167,4 +301,6 @@ def normalize_resolution(image: Image.Image, max_dimension: int = 1920) -> Image
         return image
     scale = max_dimension / float(max(width, height))
     new_size = (int(width * scale), int(height * scale))
-    return image.resize(new_size, resample=Image.BILINEAR)
+    # For downscales of 4x or more, Pillow first box-reduces by an integer factor, so the
+    # bilinear pass reads far fewer pixels; smaller downscales are resampled unchanged.
+    return image.resize(new_size, resample=Image.BILINEAR, reducing_gap=2.0)
@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
 
 
 SAFE = "SAFE"
@@ -50,3 +52,51 @@ def weighted_average(scores: Dict[str, float], weights: Dict[str, float]) -> flo
     if total_weight == 0:
         return 0.0
     return total_score / total_weight
+
+
+def weighted_average_batch(scores: Dict[str, np.ndarray], weights: Dict[str, float]) -> np.ndarray:
+    """Vectorized ``weighted_average`` over many images.
+
+    ``scores`` maps each module to an array of per-image scores, with NaN where the module
+    produced no score; the result holds one weighted mean per image (0.0 where none scored).
+    """
+    if not scores:
+        return np.zeros(0)
+    modules = list(scores)
+    matrix = np.vstack([np.asarray(scores[m], dtype=np.float64) for m in modules])
+    present = ~np.isnan(matrix)
+    w = np.array([weights.get(m, 1.0) for m in modules], dtype=np.float64)
+    total_score = w @ np.where(present, matrix, 0.0)
+    total_weight = w @ present
+    out = np.zeros_like(total_score)
+    np.divide(total_score, total_weight, out=out, where=total_weight != 0)
+    return out
+
+
+def score_stats(module_scores: Dict[str, Dict], weights: Dict[str, float]) -> Tuple[float, Optional[float]]:
+    """Weighted mean score and mean squared deviation from it, in one pass over module results.
+
+    Equivalent to ``weighted_average`` over the non-None scores followed by
+    ``sum((s - mean) ** 2) / n``; the deviation is None when no module produced a score.
+    """
+    total_weight = 0.0
+    total_score = 0.0
+    count = 0
+    sum_x = 0.0
+    sum_x2 = 0.0
+    for module, result in module_scores.items():
+        score = result.get("score") if result is not None else None
+        if score is None:
+            continue
+        weight = weights.get(module, 1.0)
+        total_score += weight * score
+        total_weight += weight
+        count += 1
+        sum_x += score
+        sum_x2 += score * score
+    mean = total_score / total_weight if total_weight else 0.0
+    if not count:
+        return mean, None
+    # sum((s - mean)^2) / n expanded so the scores are only visited once.
+    deviation = max(0.0, (sum_x2 - 2.0 * mean * sum_x + count * mean * mean) / count)
+    return mean, deviation
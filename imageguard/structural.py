@@ -9,10 +9,11 @@ import numpy as np
 from PIL import Image
 
 from .patterns import Pattern, find_matches
+from .preprocess import SharedArrays, as_shared_arrays
 
 
-def _pil_to_cv(image: Image.Image) -> np.ndarray:
-    return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+# Longest side screenshot_heuristics analyzes at; larger images are downsampled first.
+SCREENSHOT_MAX_SIDE = 1024
 
 
 def detect_qr_codes(image: np.ndarray) -> Dict:
@@ -42,10 +43,34 @@ def detect_qr_codes(image: np.ndarray) -> Dict:
     }
 
 
-def detect_barcodes(image: np.ndarray) -> Dict:
+def _zbar_decode(image: np.ndarray) -> Optional[list]:
+    """Decode every symbol zbar supports (QR included), or None if pyzbar/zbar is missing."""
     try:
         from pyzbar import pyzbar
     except Exception:
+        return None
+    return pyzbar.decode(image)
+
+
+def _symbol_data(symbol) -> str:
+    try:
+        return symbol.data.decode("utf-8", errors="ignore")
+    except Exception:
+        return str(symbol.data)
+
+
+def _qr_result(symbols: list) -> Dict:
+    decoded = [d for d in (_symbol_data(s) for s in symbols) if d]
+    return {
+        "found": bool(decoded),
+        "count": len(decoded),
+        "decoded_content": decoded,
+        "points": [[[p.x, p.y] for p in s.polygon] for s in symbols],
+    }
+
+
+def _barcode_result(symbols: Optional[list]) -> Dict:
+    if symbols is None:
         return {
             "found": False,
             "count": 0,
@@ -53,16 +78,8 @@ def detect_barcodes(image: np.ndarray) -> Dict:
             "decoded_content": [],
             "status": "unavailable",
         }
-    barcodes = pyzbar.decode(image)
-    decoded = []
-    types = []
-    for b in barcodes:
-        try:
-            data = b.data.decode("utf-8", errors="ignore")
-        except Exception:
-            data = str(b.data)
-        decoded.append(data)
-        types.append(getattr(b, "type", "unknown"))
+    decoded = [_symbol_data(b) for b in symbols]
+    types = [getattr(b, "type", "unknown") for b in symbols]
     return {
         "found": bool(decoded),
         "count": len(decoded),
@@ -72,37 +89,57 @@ def detect_barcodes(image: np.ndarray) -> Dict:
     }
 
 
-def screenshot_heuristics(gray: np.ndarray) -> Dict:
+def detect_barcodes(image: np.ndarray) -> Dict:
+    return _barcode_result(_zbar_decode(image))
+
+
+def screenshot_heuristics(gray: np.ndarray, edges: Optional[np.ndarray] = None) -> Dict:
+    """Score UI cues in ``gray``; pass ``edges`` to reuse a Canny (50/150) map of it."""
     h, w = gray.shape
     aspect = w / h if h else 0.0
     common_ratios = [16 / 9, 9 / 16, 4 / 3, 3 / 4]
     aspect_match = any(abs(aspect - r) < 0.15 for r in common_ratios)
 
-    edges = cv2.Canny(gray, 50, 150)
-    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=80, minLineLength=min(w, h) // 4, maxLineGap=10)
+    # Hough and contour cost grow with pixel count; UI bars and panels survive a downsample,
+    # so large inputs are analyzed at SCREENSHOT_MAX_SIDE with pixel thresholds scaled to match.
+    scale = min(1.0, SCREENSHOT_MAX_SIDE / max(h, w, 1))
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        edges = None
+        h, w = gray.shape
+
+    if edges is None:
+        edges = cv2.Canny(gray, 50, 150)
+    lines = cv2.HoughLinesP(
+        edges,
+        1,
+        np.pi / 180,
+        threshold=max(1, round(80 * scale)),
+        minLineLength=min(w, h) // 4,
+        maxLineGap=max(1, round(10 * scale)),
+    )
     line_count = 0 if lines is None else len(lines)
 
-    # Count horizontal lines near top/bottom for UI bars.
+    # Horizontal lines near top/bottom indicate UI bars.
     top_bar = False
     bottom_bar = False
     if lines is not None:
-        for x1, y1, x2, y2 in lines[:, 0]:
-            if abs(y1 - y2) < 4:
-                if y1 < h * 0.1:
-                    top_bar = True
-                if y1 > h * 0.9:
-                    bottom_bar = True
+        # OpenCV 4 returns (N, 1, 4) and OpenCV 5 returns (N, 4).
+        x1, y1, x2, y2 = lines.reshape(-1, 4).T
+        bar_y = y1[np.abs(y1 - y2) < 4 * scale]
+        top_bar = bool((bar_y < h * 0.1).any())
+        bottom_bar = bool((bar_y > h * 0.9).any())
 
     # Count rectangle-like contours for UI elements.
-    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 21, 10)
+    block_size = max(3, round(21 * scale) | 1)
+    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, block_size, 10)
     contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     rects = 0
-    for c in contours:
-        x, y, rw, rh = cv2.boundingRect(c)
-        if rw * rh < 200:
-            continue
-        if 2 < rw / max(rh, 1) < 20:
-            rects += 1
+    if contours:
+        boxes = np.array([cv2.boundingRect(c) for c in contours])
+        rw, rh = boxes[:, 2], boxes[:, 3]
+        box_aspect = rw / np.maximum(rh, 1)
+        rects = int(np.count_nonzero((rw * rh >= 200 * scale * scale) & (box_aspect > 2) & (box_aspect < 20)))
 
     detected_ui = []
     confidence = 0.0
@@ -132,8 +169,10 @@ def screenshot_heuristics(gray: np.ndarray) -> Dict:
     }
 
 
-def detect_text_overlay(gray: np.ndarray) -> Dict:
-    edges = cv2.Canny(gray, 50, 150)
+def detect_text_overlay(gray: np.ndarray, edges: Optional[np.ndarray] = None) -> Dict:
+    """Find wide edge clusters typical of overlaid text; pass ``edges`` to reuse a Canny (50/150) map of ``gray``."""
+    if edges is None:
+        edges = cv2.Canny(gray, 50, 150)
     dilated = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=1)
     contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
@@ -157,18 +196,32 @@ def detect_text_overlay(gray: np.ndarray) -> Dict:
 
 
 def analyze_structural(
-    image: Image.Image,
+    image: Image.Image | SharedArrays,
     enable_qr: bool = True,
     enable_barcodes: bool = True,
     enable_screenshots: bool = True,
     analyze_decoded_content: bool = True,
     patterns: Optional[List[Pattern]] = None,
 ) -> Dict:
-    cv_img = _pil_to_cv(image)
-    gray = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY)
+    arrays = as_shared_arrays(image)
+    gray = arrays.gray_u8
 
-    qr = detect_qr_codes(cv_img) if enable_qr else {"found": False, "count": 0, "decoded_content": []}
-    barcodes = detect_barcodes(cv_img) if enable_barcodes else {"found": False, "count": 0, "types": [], "decoded_content": []}
+    # zbar decodes QR codes as well as linear barcodes, so a single pass over the
+    # grayscale image serves both; OpenCV's QR detector is only the fallback.
+    symbols = _zbar_decode(gray) if (enable_qr or enable_barcodes) else None
+    if not enable_qr:
+        qr = {"found": False, "count": 0, "decoded_content": []}
+    elif symbols is not None:
+        qr = _qr_result([s for s in symbols if s.type == "QRCODE"])
+    else:
+        qr = detect_qr_codes(cv2.cvtColor(arrays.rgb, cv2.COLOR_RGB2BGR))
+    if not enable_barcodes:
+        barcodes = {"found": False, "count": 0, "types": [], "decoded_content": []}
+    elif symbols is not None and enable_qr:
+        # QR symbols are already reported under qr_codes.
+        barcodes = _barcode_result([s for s in symbols if s.type != "QRCODE"])
+    else:
+        barcodes = _barcode_result(symbols)
 
     decoded_payloads = []
     decoded_payloads.extend(qr.get("decoded_content", []))
@@ -181,8 +234,9 @@ def analyze_structural(
                 break
     qr["contains_injection"] = contains_injection if qr.get("found") else False
 
-    screenshot = screenshot_heuristics(gray) if enable_screenshots else {"is_screenshot": False, "confidence": 0.0}
-    text_overlay = detect_text_overlay(gray)
+    edges = cv2.Canny(gray, 50, 150)
+    screenshot = screenshot_heuristics(gray, edges) if enable_screenshots else {"is_screenshot": False, "confidence": 0.0}
+    text_overlay = detect_text_overlay(gray, edges)
 
     score = 0.0
     if qr.get("found") or barcodes.get("found"):
@@ -4,11 +4,13 @@ from __future__ import annotations
 
 import codecs
 import re
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from PIL import Image
 
 from .patterns import DEFAULT_PATTERNS, Pattern, find_matches
+from .preprocess import SharedArrays
 
 
 # Leetspeak character mappings (character -> possible leetspeak representations)
@@ -454,6 +456,18 @@ def run_ocr(image: Image.Image, languages: Optional[List[str]] = None, psm: int
     return text, avg_conf
 
 
+# OCR runs in tesseract subprocesses, so a thread per call is enough to use several cores.
+_ocr_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="imageguard-ocr")
+
+
+def run_ocr_many(images: Sequence[Image.Image], languages: Optional[List[str]] = None, psm: int = 6, tesseract_cmd: Optional[str] = None) -> List[Tuple[str, float]]:
+    """run_ocr over several images concurrently; results are in input order."""
+    if len(images) <= 1:
+        return [run_ocr(img, languages=languages, psm=psm, tesseract_cmd=tesseract_cmd) for img in images]
+    futures = [_ocr_executor.submit(run_ocr, img, languages, psm, tesseract_cmd) for img in images]
+    return [f.result() for f in futures]
+
+
 def _preprocess_for_ocr(image: Image.Image, method: str = "default") -> Image.Image:
     """Apply preprocessing to improve OCR accuracy."""
     from PIL import ImageOps, ImageFilter, ImageEnhance
@@ -671,7 +685,7 @@ def calculate_text_score(
 
 
 def analyze_text(
-    image: Image.Image,
+    image: Image.Image | SharedArrays,
     image_area: int,
     languages: Optional[List[str]] = None,
     patterns: Optional[List[Pattern]] = None,
@@ -682,6 +696,8 @@ def analyze_text(
     tesseract_cmd: Optional[str] = None,
 ) -> Dict:
     """Perform OCR and pattern analysis, returning module details."""
+    if isinstance(image, SharedArrays):
+        image = image.pil
     extracted_text = ""
     confidence = 0.0
     ocr_details = {}
@@ -20,19 +20,23 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
 from pathlib import Path
 
+import numpy as np
 
-def weighted_average(scores: dict, weights: dict) -> float:
-    total_weight = 0.0
-    total_score = 0.0
-    for k, v in scores.items():
-        if v is None:
-            continue
-        w = weights.get(k, 1.0)
-        total_weight += w
-        total_score += w * float(v)
-    return total_score / total_weight if total_weight else 0.0
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from imageguard.scoring import weighted_average_batch  # noqa: E402
+
+
+def score_arrays(data) -> dict:
+    """Per-module arrays of scores across the dataset, NaN where an item has no score."""
+    modules = dict.fromkeys(k for item in data for k in item["module_scores"])
+    return {
+        m: np.array([np.nan if item["module_scores"].get(m) is None else float(item["module_scores"][m]) for item in data])
+        for m in modules
+    }
 
 
 def f1(precision: float, recall: float) -> float:
@@ -41,20 +45,11 @@ def f1(precision: float, recall: float) -> float:
     return 2 * precision * recall / (precision + recall)
 
 
-def evaluate(data, weights, threshold):
-    tp = fp = tn = fn = 0
-    for item in data:
-        score = weighted_average(item["module_scores"], weights)
-        pred = 1 if score >= threshold else 0
-        label = int(item["label"])
-        if pred == 1 and label == 1:
-            tp += 1
-        elif pred == 1 and label == 0:
-            fp += 1
-        elif pred == 0 and label == 0:
-            tn += 1
-        elif pred == 0 and label == 1:
-            fn += 1
+def evaluate(scores: np.ndarray, labels: np.ndarray, threshold: float):
+    pred = scores >= threshold
+    tp = int(np.count_nonzero(pred & labels))
+    fp = int(np.count_nonzero(pred & ~labels))
+    fn = int(np.count_nonzero(~pred & labels))
     precision = tp / (tp + fp) if (tp + fp) else 0.0
     recall = tp / (tp + fn) if (tp + fn) else 0.0
     return {
@@ -73,6 +68,8 @@ def main() -> int:
 
     data = json.loads(Path(args.input).read_text(encoding="utf-8"))
     modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+    scores_by_module = score_arrays(data)
+    labels = np.array([int(item["label"]) == 1 for item in data], dtype=bool)
     weight_grid = [0.5, 1.0, 1.5, 2.0]
     thresholds = [0.3, 0.4, 0.5, 0.6, 0.7]
 
@@ -89,8 +86,10 @@ def main() -> int:
                             modules[3]: w_stego,
                             modules[4]: w_struct,
                         }
+                        # Score the whole dataset once per weight set, then sweep thresholds.
+                        scores = weighted_average_batch(scores_by_module, weights)
                         for threshold in thresholds:
-                            metrics = evaluate(data, weights, threshold)
+                            metrics = evaluate(scores, labels, threshold)
                             if metrics["f1"] > best["f1"]:
                                 best = {
                                     "weights": weights,
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Compile config.yaml into imageguard/_config_generated.py.
+
+load_config() imports the generated module instead of parsing YAML when the
+config file's SHA-256 matches the one recorded at compile time, so edits to the
+YAML (or a different file mounted in its place) fall back to normal parsing.
+API keys listed in the YAML are copied into the generated module; prefer
+IMAGEGUARD_API_KEYS, which always bypasses the compiled config.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import sys
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from imageguard.config import _build_config  # noqa: E402
+
+HEADER = '''"""Generated by scripts/compile_config.py from {source}; do not edit."""
+
+from .config import ApiConfig, Config, ModuleConfig, OutputConfig, Thresholds  # noqa: F401
+
+'''
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Precompile config.yaml into a Python module")
+    parser.add_argument("--config", default="config.yaml", help="YAML config to compile")
+    parser.add_argument("--out", default="imageguard/_config_generated.py", help="Output module")
+    args = parser.parse_args()
+
+    data = Path(args.config).read_bytes()
+    config = _build_config(yaml.safe_load(data) or {}, "")
+
+    module = HEADER.format(source=Path(args.config).name)
+    module += f"SOURCE_SHA256 = {hashlib.sha256(data).hexdigest()!r}\n\n"
+    module += f"CONFIG = {config!r}\n"
+    Path(args.out).write_text(module, encoding="utf-8")
+    print(f"Wrote compiled config to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())